@@ -14,6 +14,13 @@ def _get_int(name: str, default: int) -> int:
     return int(value)
 
 
+def _get_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return float(value)
+
+
 def _get_bool(name: str, default: bool) -> bool:
     value = os.getenv(name)
     if value is None:
@@ -28,6 +35,24 @@ def _get_optional_int(name: str) -> int | None:
     return int(value)
 
 
+def _get_optional_path(name: str) -> Path | None:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return None
+    return Path(value)
+
+
+def _get_limits(name: str) -> dict[str, int]:
+    raw = os.getenv(name, "")
+    limits: dict[str, int] = {}
+    for item in raw.split(","):
+        if not item.strip():
+            continue
+        key, _, value = item.rpartition(":")
+        limits[key.strip()] = int(value)
+    return limits
+
+
 def _get_origins() -> list[str]:
     raw = os.getenv("MEGA_FACIL_ALLOWED_ORIGINS", "*")
     origins = [item.strip() for item in raw.split(",") if item.strip()]
@@ -37,13 +62,44 @@ def _get_origins() -> list[str]:
 @dataclass(frozen=True)
 class Settings:
     csv_path: Path
+    history_bin_path: Path | None
+    history_check_interval: float
+    history_background_refresh: bool
     db_path: Path
     window_size: int
+    score_cache_size: int
+    enumeration_cache_size: int
     combinations_per_card: int
     credits_per_card: int
+    bulk_max_cards: int
+    bulk_chunk_size: int
+    bulk_max_wait: float
+    generate_workers: int
+    generate_max_queue: int
+    db_workers: int
+    db_max_queue: int
+    saturation_retry_after: int
+    backtest_workers: int
+    backtest_max_queue: int
+    password_workers: int
+    password_max_queue: int
+    password_algorithm: str
+    password_iterations: int
+    db_synchronous: str
+    ledger_group_commit: bool
+    ledger_max_batch: int
+    ledger_max_delay_ms: float
     rate_limit_max_requests: int
     rate_limit_window_seconds: int
+    rate_limit_backend: str
+    rate_limit_db_path: Path
+    rate_limit_stripes: int
+    rate_limit_role_limits: dict[str, int]
+    rate_limit_user_limits: dict[str, int]
     allowed_origins: list[str]
+    gzip_min_size: int
+    metrics_enabled: bool
+    metrics_token: str | None
     seed: int | None
     trust_proxy_headers: bool
     require_api_key: bool
@@ -56,15 +112,50 @@ settings = Settings(
     csv_path=Path(
         os.getenv("MEGA_FACIL_CSV_PATH", str(BASE_DIR / "data" / "mega_sena.csv"))
     ),
+    history_bin_path=_get_optional_path("MEGA_FACIL_HISTORY_BIN_PATH"),
+    history_check_interval=_get_float("MEGA_FACIL_HISTORY_CHECK_INTERVAL", 1.0),
+    history_background_refresh=_get_bool("MEGA_FACIL_HISTORY_BACKGROUND_REFRESH", True),
     db_path=Path(
         os.getenv("MEGA_FACIL_DB_PATH", str(BASE_DIR / "data" / "mega_facil.db"))
     ),
     window_size=_get_int("MEGA_FACIL_WINDOW_SIZE", 50),
+    score_cache_size=_get_int("MEGA_FACIL_SCORE_CACHE_SIZE", 32),
+    enumeration_cache_size=_get_int("MEGA_FACIL_ENUMERATION_CACHE_SIZE", 4),
     combinations_per_card=_get_int("MEGA_FACIL_COMBINATIONS_PER_CARD", 3),
     credits_per_card=_get_int("MEGA_FACIL_CREDITS_PER_CARD", 1),
+    bulk_max_cards=_get_int("MEGA_FACIL_BULK_MAX_CARDS", 10000),
+    bulk_chunk_size=_get_int("MEGA_FACIL_BULK_CHUNK_SIZE", 500),
+    bulk_max_wait=_get_float("MEGA_FACIL_BULK_MAX_WAIT", 30.0),
+    generate_workers=_get_int("MEGA_FACIL_GENERATE_WORKERS", 4),
+    generate_max_queue=_get_int("MEGA_FACIL_GENERATE_MAX_QUEUE", 32),
+    db_workers=_get_int("MEGA_FACIL_DB_WORKERS", 8),
+    db_max_queue=_get_int("MEGA_FACIL_DB_MAX_QUEUE", 64),
+    saturation_retry_after=_get_int("MEGA_FACIL_SATURATION_RETRY_AFTER", 1),
+    backtest_workers=_get_int("MEGA_FACIL_BACKTEST_WORKERS", 1),
+    backtest_max_queue=_get_int("MEGA_FACIL_BACKTEST_MAX_QUEUE", 8),
+    password_workers=_get_int("MEGA_FACIL_PASSWORD_WORKERS", 2),
+    password_max_queue=_get_int("MEGA_FACIL_PASSWORD_MAX_QUEUE", 32),
+    password_algorithm=os.getenv("MEGA_FACIL_PASSWORD_ALGORITHM", "sha256").strip().lower(),
+    password_iterations=_get_int("MEGA_FACIL_PASSWORD_ITERATIONS", 120_000),
+    db_synchronous=os.getenv("MEGA_FACIL_DB_SYNCHRONOUS", "NORMAL").strip().upper(),
+    ledger_group_commit=_get_bool("MEGA_FACIL_LEDGER_GROUP_COMMIT", False),
+    ledger_max_batch=_get_int("MEGA_FACIL_LEDGER_MAX_BATCH", 256),
+    ledger_max_delay_ms=_get_float("MEGA_FACIL_LEDGER_MAX_DELAY_MS", 2.0),
     rate_limit_max_requests=_get_int("MEGA_FACIL_RATE_LIMIT_MAX", 20),
     rate_limit_window_seconds=_get_int("MEGA_FACIL_RATE_LIMIT_WINDOW", 60),
+    rate_limit_backend=os.getenv("MEGA_FACIL_RATE_LIMIT_BACKEND", "memory").strip().lower(),
+    rate_limit_db_path=Path(
+        os.getenv(
+            "MEGA_FACIL_RATE_LIMIT_DB_PATH", str(BASE_DIR / "data" / "rate_limit.db")
+        )
+    ),
+    rate_limit_stripes=_get_int("MEGA_FACIL_RATE_LIMIT_STRIPES", 16),
+    rate_limit_role_limits=_get_limits("MEGA_FACIL_RATE_LIMIT_ROLE_LIMITS"),
+    rate_limit_user_limits=_get_limits("MEGA_FACIL_RATE_LIMIT_USER_LIMITS"),
     allowed_origins=_get_origins(),
+    gzip_min_size=_get_int("MEGA_FACIL_GZIP_MIN_SIZE", 1024),
+    metrics_enabled=_get_bool("MEGA_FACIL_METRICS_ENABLED", False),
+    metrics_token=os.getenv("MEGA_FACIL_METRICS_TOKEN") or None,
     seed=_get_optional_int("MEGA_FACIL_SEED"),
     trust_proxy_headers=_get_bool("MEGA_FACIL_TRUST_PROXY_HEADERS", False),
     require_api_key=_get_bool("MEGA_FACIL_REQUIRE_API_KEY", True),
@@ -1,19 +1,45 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
 from datetime import datetime
 from pathlib import Path
+import queue
 import sqlite3
-from typing import Iterable, Optional
+import threading
+import time
+from typing import ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
 from uuid import uuid4
 
-from .security import generate_api_key, hash_password
+from .metrics import SQLITE_LOCK_WAIT_SECONDS
+from .security import (
+    DEFAULT_PASSWORD_ALGORITHM,
+    DEFAULT_PASSWORD_ITERATIONS,
+    generate_api_key,
+    hash_password,
+)
+from .services.cache import TTLCache
 
 ROLE_ADMIN = "admin"
 ROLE_USER = "user"
 ROLE_AFFILIATE = "affiliate"
 VALID_ROLES = {ROLE_ADMIN, ROLE_USER, ROLE_AFFILIATE}
 
+POOL_MAX_IDLE = 8
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+DEFAULT_SYNCHRONOUS = "NORMAL"
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+PRINCIPAL_CACHE_SIZE = 4096
+PRINCIPAL_CACHE_TTL_SECONDS = 30.0
+LEDGER_MAX_BATCH = 256
+LEDGER_MAX_DELAY_MS = 2.0
+USER_PAGE_MAX = 200
+USER_SUMMARY_COLUMNS = "id, username, role, credits, is_active, created_at"
+
+UserCursor = Tuple[str, str]
+
 
 @dataclass(frozen=True)
 class UserRecord:
@@ -28,6 +54,227 @@ class UserRecord:
     created_at: str
 
 
+@dataclass(frozen=True)
+class UserSummary:
+    id: str
+    username: str
+    role: str
+    credits: int
+    is_active: bool
+    created_at: str
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        db_path: Path,
+        max_idle: int = POOL_MAX_IDLE,
+        busy_timeout_ms: int = BUSY_TIMEOUT_MS,
+        synchronous: str = DEFAULT_SYNCHRONOUS,
+    ) -> None:
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"Invalid synchronous mode: {synchronous}")
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self.busy_timeout_ms = busy_timeout_ms
+        self.synchronous = synchronous
+        self._lock = threading.Lock()
+        self._idle: List[sqlite3.Connection] = []
+        self._closed = False
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._release(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._closed = True
+        for conn in idle:
+            conn.close()
+
+    def _acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._open()
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if not self._closed and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+
+_pools: Dict[Path, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: Path) -> ConnectionPool:
+    pool = _pools.get(db_path)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = ConnectionPool(db_path)
+            _pools[db_path] = pool
+        return pool
+
+
+def configure_pool(db_path: Path, synchronous: str = DEFAULT_SYNCHRONOUS) -> ConnectionPool:
+    pool = ConnectionPool(db_path, synchronous=synchronous)
+    with _pools_lock:
+        previous = _pools.get(db_path)
+        _pools[db_path] = pool
+    if previous is not None:
+        previous.close()
+    return pool
+
+
+def close_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+class PrincipalCache:
+    def __init__(
+        self,
+        max_entries: int = PRINCIPAL_CACHE_SIZE,
+        ttl_seconds: float = PRINCIPAL_CACHE_TTL_SECONDS,
+    ) -> None:
+        self.by_id: TTLCache[UserRecord] = TTLCache(max_entries, ttl_seconds)
+        self.by_api_key: TTLCache[str] = TTLCache(max_entries, ttl_seconds)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stamp = 0
+        self._written: Dict[Tuple[Path, str], int] = {}
+        self._reads: Dict[int, int] = {}
+        self._prune_at = max(max_entries, 1)
+
+    def get_by_id(self, db_path: Path, user_id: str) -> Optional[UserRecord]:
+        user = self.by_id.get((db_path, user_id))
+        if user is None:
+            stamp = self._begin_read()
+            try:
+                user = get_user_by_id(db_path, user_id)
+                if user is not None:
+                    self._store(db_path, user, stamp)
+            finally:
+                self._end_read(stamp)
+        return user
+
+    def get_by_api_key(self, db_path: Path, api_key: str) -> Optional[UserRecord]:
+        user_id = self.by_api_key.get((db_path, api_key))
+        if user_id is not None:
+            user = self.by_id.get((db_path, user_id))
+            if user is not None and user.api_key == api_key:
+                return user
+
+        stamp = self._begin_read()
+        try:
+            user = get_user_by_api_key(db_path, api_key)
+            if user is not None:
+                self._store(db_path, user, stamp)
+        finally:
+            self._end_read(stamp)
+        return user
+
+    def begin_write(self, db_path: Path, user_id: str) -> int:
+        with self._lock:
+            return self._mark_written((db_path, user_id))
+
+    def invalidate(self, db_path: Path, user_id: str) -> None:
+        key = (db_path, user_id)
+        with self._lock:
+            self._mark_written(key)
+            self._evict(key)
+
+    def update_credits(self, db_path: Path, user_id: str, credits: int, write_stamp: int) -> None:
+        key = (db_path, user_id)
+        with self._lock:
+            concurrent = self._written.get(key) != write_stamp
+            self._mark_written(key)
+            if concurrent:
+                self._evict(key)
+            else:
+                self.by_id.replace(key, lambda user: replace(user, credits=credits))
+
+    def clear(self) -> None:
+        with self._lock:
+            self.by_id.clear()
+            self.by_api_key.clear()
+
+    def _begin_read(self) -> int:
+        with self._lock:
+            self._reads[self._stamp] = self._reads.get(self._stamp, 0) + 1
+            return self._stamp
+
+    def _end_read(self, stamp: int) -> None:
+        with self._lock:
+            remaining = self._reads[stamp] - 1
+            if remaining:
+                self._reads[stamp] = remaining
+            else:
+                del self._reads[stamp]
+
+    def _mark_written(self, key: Tuple[Path, str]) -> int:
+        self._stamp += 1
+        self._written[key] = self._stamp
+        if len(self._written) > self._prune_at:
+            self._prune()
+        return self._stamp
+
+    def _prune(self) -> None:
+        oldest_read = min(self._reads, default=self._stamp)
+        self._written = {
+            key: stamp for key, stamp in self._written.items() if stamp > oldest_read
+        }
+        self._prune_at = max(self.max_entries, 2 * len(self._written), 1)
+
+    def _evict(self, key: Tuple[Path, str]) -> None:
+        user = self.by_id.pop(key)
+        if user is not None:
+            self.by_api_key.pop((key[0], user.api_key))
+
+    def _store(self, db_path: Path, user: UserRecord, read_stamp: int) -> None:
+        key = (db_path, user.id)
+        with self._lock:
+            if self._written.get(key, 0) > read_stamp:
+                return
+            self.by_id.put(key, user)
+            self.by_api_key.put((db_path, user.api_key), user.id)
+
+
+principal_cache = PrincipalCache()
+
+
 def init_db(db_path: Path) -> None:
     db_path.parent.mkdir(parents=True, exist_ok=True)
     with _connect(db_path) as conn:
@@ -55,6 +302,12 @@ def init_db(db_path: Path) -> None:
             );
             CREATE INDEX IF NOT EXISTS idx_users_api_key ON users(api_key);
             CREATE INDEX IF NOT EXISTS idx_credit_user_id ON credit_transactions(user_id);
+            CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at, id);
+            CREATE INDEX IF NOT EXISTS idx_users_role_created_at ON users(role, created_at, id);
+            CREATE INDEX IF NOT EXISTS idx_users_active_created_at
+                ON users(is_active, created_at, id);
+            CREATE INDEX IF NOT EXISTS idx_users_role_active_created_at
+                ON users(role, is_active, created_at, id);
             """
         )
         conn.commit()
@@ -66,12 +319,16 @@ def create_user(
     password: str,
     role: str,
     credits: int = 0,
+    password_algorithm: str = DEFAULT_PASSWORD_ALGORITHM,
+    password_iterations: int = DEFAULT_PASSWORD_ITERATIONS,
 ) -> UserRecord:
     if role not in VALID_ROLES:
         raise ValueError("Invalid role")
 
     user_id = str(uuid4())
-    salt, digest = hash_password(password)
+    salt, digest = hash_password(
+        password, algorithm=password_algorithm, iterations=password_iterations
+    )
     api_key = generate_api_key()
     created_at = _now()
 
@@ -87,6 +344,7 @@ def create_user(
             conn.commit()
         except sqlite3.IntegrityError as exc:
             raise ValueError("Username already exists") from exc
+    principal_cache.invalidate(db_path, user_id)
 
     return UserRecord(
         id=user_id,
@@ -120,26 +378,246 @@ def add_credits(
     reason: str | None,
     created_by: str | None,
 ) -> int:
-    with _connect(db_path) as conn:
-        row = conn.execute("SELECT credits FROM users WHERE id = ?", (user_id,)).fetchone()
-        if row is None:
-            raise ValueError("User not found")
+    with _transaction(db_path) as conn:
+        new_total = _apply_credit_delta(conn, user_id, delta, reason, created_by)
+    principal_cache.invalidate(db_path, user_id)
+    return new_total
 
-        current = int(row["credits"])
-        new_total = current + delta
-        if new_total < 0:
-            raise ValueError("Insufficient credits")
 
-        conn.execute("UPDATE users SET credits = ? WHERE id = ?", (new_total, user_id))
-        conn.execute(
-            """
-            INSERT INTO credit_transactions (user_id, delta, reason, created_by, created_at)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (user_id, delta, reason, created_by, _now()),
+def debit_credits(
+    db_path: Path,
+    user_id: str,
+    amount: int,
+    reason: str | None,
+    created_by: str | None,
+) -> int:
+    if amount < 0:
+        raise ValueError("Invalid debit amount")
+    write_stamp = principal_cache.begin_write(db_path, user_id)
+    with _transaction(db_path) as conn:
+        new_total = _debit_credits(conn, user_id, amount, reason, created_by)
+    principal_cache.update_credits(db_path, user_id, new_total, write_stamp)
+    return new_total
+
+
+@dataclass(frozen=True)
+class _LedgerEntry:
+    user_id: str
+    amount: int
+    reason: str | None
+    created_by: str | None
+    write_stamp: int
+    future: Future
+
+
+class LedgerWriter:
+    def __init__(
+        self,
+        db_path: Path,
+        max_batch: int = LEDGER_MAX_BATCH,
+        max_delay_ms: float = LEDGER_MAX_DELAY_MS,
+    ) -> None:
+        self.db_path = db_path
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max(0.0, max_delay_ms) / 1000
+        self._queue: queue.SimpleQueue[Optional[_LedgerEntry]] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._commits = 0
+        self._entries = 0
+
+    def submit(
+        self,
+        user_id: str,
+        amount: int,
+        reason: str | None,
+        created_by: str | None,
+    ) -> Future:
+        if amount < 0:
+            raise ValueError("Invalid debit amount")
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Ledger writer is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="ledger-writer", daemon=True
+                )
+                self._thread.start()
+            write_stamp = principal_cache.begin_write(self.db_path, user_id)
+            self._queue.put(
+                _LedgerEntry(user_id, amount, reason, created_by, write_stamp, future)
+            )
+        return future
+
+    def debit(
+        self,
+        user_id: str,
+        amount: int,
+        reason: str | None,
+        created_by: str | None,
+    ) -> int:
+        return self.submit(user_id, amount, reason, created_by).result()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            self._queue.put(None)
+        if thread is not None:
+            thread.join()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            commits, entries = self._commits, self._entries
+        return {
+            "commits": commits,
+            "entries": entries,
+            "avg_batch": entries / commits if commits else 0.0,
+        }
+
+    def _run(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+            batch = [entry]
+            stopping = False
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    entry = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+            self._commit(batch)
+            if stopping:
+                return
+
+    def _commit(self, batch: List[_LedgerEntry]) -> None:
+        batch = [entry for entry in batch if entry.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        results: List[int | ValueError] = []
+        try:
+            with _transaction(self.db_path) as conn:
+                for entry in batch:
+                    try:
+                        results.append(
+                            _debit_credits(
+                                conn, entry.user_id, entry.amount, entry.reason, entry.created_by
+                            )
+                        )
+                    except ValueError as exc:
+                        results.append(exc)
+        except Exception as exc:
+            for entry in batch:
+                entry.future.set_exception(exc)
+            return
+
+        with self._lock:
+            self._commits += 1
+            self._entries += len(batch)
+        for entry, result in zip(batch, results):
+            if isinstance(result, ValueError):
+                entry.future.set_exception(result)
+                continue
+            principal_cache.update_credits(
+                self.db_path, entry.user_id, result, entry.write_stamp
+            )
+            entry.future.set_result(result)
+
+
+def set_user_active(db_path: Path, user_id: str, is_active: bool) -> bool:
+    with _transaction(db_path) as conn:
+        cursor = conn.execute(
+            "UPDATE users SET is_active = ? WHERE id = ?",
+            (1 if is_active else 0, user_id),
         )
-        conn.commit()
-        return new_total
+        updated = cursor.rowcount > 0
+    principal_cache.invalidate(db_path, user_id)
+    return updated
+
+
+def update_password_hash(
+    db_path: Path,
+    user_id: str,
+    previous_hash: str,
+    salt: str,
+    digest: str,
+) -> bool:
+    with _transaction(db_path) as conn:
+        cursor = conn.execute(
+            "UPDATE users SET password_salt = ?, password_hash = ? "
+            "WHERE id = ? AND password_hash = ?",
+            (salt, digest, user_id, previous_hash),
+        )
+        updated = cursor.rowcount > 0
+    principal_cache.invalidate(db_path, user_id)
+    return updated
+
+
+def _apply_credit_delta(
+    conn: sqlite3.Connection,
+    user_id: str,
+    delta: int,
+    reason: str | None,
+    created_by: str | None,
+) -> int:
+    rows = conn.execute(
+        "UPDATE users SET credits = credits + ? WHERE id = ? AND credits + ? >= 0 RETURNING credits",
+        (delta, user_id, delta),
+    ).fetchall()
+    if not rows:
+        _raise_credit_error(conn, user_id)
+    _insert_credit_transaction(conn, user_id, delta, reason, created_by)
+    return int(rows[0]["credits"])
+
+
+def _debit_credits(
+    conn: sqlite3.Connection,
+    user_id: str,
+    amount: int,
+    reason: str | None,
+    created_by: str | None,
+) -> int:
+    rows = conn.execute(
+        "UPDATE users SET credits = credits - ? WHERE id = ? AND credits >= ? RETURNING credits",
+        (amount, user_id, amount),
+    ).fetchall()
+    if not rows:
+        _raise_credit_error(conn, user_id)
+    _insert_credit_transaction(conn, user_id, -amount, reason, created_by)
+    return int(rows[0]["credits"])
+
+
+def _insert_credit_transaction(
+    conn: sqlite3.Connection,
+    user_id: str,
+    delta: int,
+    reason: str | None,
+    created_by: str | None,
+) -> None:
+    conn.execute(
+        """
+        INSERT INTO credit_transactions (user_id, delta, reason, created_by, created_at)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (user_id, delta, reason, created_by, _now()),
+    )
+
+
+def _raise_credit_error(conn: sqlite3.Connection, user_id: str) -> None:
+    exists = conn.execute("SELECT 1 FROM users WHERE id = ?", (user_id,)).fetchone()
+    if exists is None:
+        raise ValueError("User not found")
+    raise ValueError("Insufficient credits")
 
 
 def list_users(db_path: Path) -> Iterable[UserRecord]:
@@ -148,6 +626,49 @@ def list_users(db_path: Path) -> Iterable[UserRecord]:
     return [_row_to_user(row) for row in rows]
 
 
+def list_user_page(
+    db_path: Path,
+    limit: int,
+    cursor: Optional[UserCursor] = None,
+    role: str | None = None,
+    is_active: bool | None = None,
+) -> Tuple[List[UserSummary], Optional[UserCursor]]:
+    limit = max(1, min(limit, USER_PAGE_MAX))
+    clauses: List[str] = []
+    params: List[object] = []
+    if role is not None:
+        clauses.append("role = ?")
+        params.append(role)
+    if is_active is not None:
+        clauses.append("is_active = ?")
+        params.append(1 if is_active else 0)
+    if cursor is not None:
+        clauses.append("(created_at, id) < (?, ?)")
+        params.extend(cursor)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    with _connect(db_path) as conn:
+        rows = conn.execute(
+            f"SELECT {USER_SUMMARY_COLUMNS} FROM users {where} "
+            "ORDER BY created_at DESC, id DESC LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+
+    users = [
+        UserSummary(
+            id=row["id"],
+            username=row["username"],
+            role=row["role"],
+            credits=int(row["credits"]),
+            is_active=bool(row["is_active"]),
+            created_at=row["created_at"],
+        )
+        for row in rows[:limit]
+    ]
+    next_cursor = (users[-1].created_at, users[-1].id) if len(rows) > limit else None
+    return users, next_cursor
+
+
 def _fetch_one(db_path: Path, query: str, params: tuple) -> Optional[UserRecord]:
     with _connect(db_path) as conn:
         row = conn.execute(query, params).fetchone()
@@ -170,10 +691,25 @@ def _row_to_user(row: sqlite3.Row) -> UserRecord:
     )
 
 
-def _connect(db_path: Path) -> sqlite3.Connection:
-    conn = sqlite3.connect(db_path, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+def _connect(db_path: Path) -> ContextManager[sqlite3.Connection]:
+    return get_pool(db_path).connection()
+
+
+def begin_immediate(conn: sqlite3.Connection) -> None:
+    with SQLITE_LOCK_WAIT_SECONDS.time():
+        conn.execute("BEGIN IMMEDIATE")
+
+
+@contextmanager
+def _transaction(db_path: Path) -> Iterator[sqlite3.Connection]:
+    with _connect(db_path) as conn:
+        begin_immediate(conn)
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
 
 
 def _now() -> str:
@@ -1,28 +1,57 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import json
 import logging
+import secrets
+import sqlite3
 import time
-from typing import Optional
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple, TypeVar
 
 import numpy as np
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 
 from .config import settings
 from .db import (
     ROLE_ADMIN,
     ROLE_AFFILIATE,
     ROLE_USER,
+    USER_PAGE_MAX,
+    VALID_ROLES,
+    LedgerWriter,
+    UserCursor,
+    UserRecord,
     add_credits,
+    begin_immediate,
+    close_pools,
+    configure_pool,
     create_user,
-    get_user_by_api_key,
+    debit_credits,
+    get_pool,
     get_user_by_id,
     get_user_by_username,
     init_db,
+    list_user_page,
+    principal_cache,
+    set_user_active,
+    update_password_hash,
+)
+from .metrics import (
+    RATE_LIMITED,
+    REQUEST_SECONDS,
+    STAGE_SECONDS,
+    register_cache_metrics,
+    register_executor_metrics,
+    registry,
 )
 from .models import (
-    CardResponse,
-    CombinationResponse,
+    BacktestJobResponse,
+    BacktestRequest,
+    BulkGenerateRequest,
     CreditRequest,
     CreditResponse,
     CreateUserRequest,
@@ -30,13 +59,36 @@ from .models import (
     GenerateResponse,
     LoginRequest,
     LoginResponse,
+    UserPageResponse,
     UserResponse,
+    UserStatusRequest,
+    UserSummaryResponse,
+    UserStatusResponse,
+)
+from .security import hash_password, needs_rehash, verify_password
+from .services.backtest import BacktestConfig
+from .services.cache import VersionedCache
+from .services.data import HistoryCache, HistorySnapshot
+from .services.executor import BoundedExecutor, ExecutorSaturated
+from .services.export import (
+    FORMAT_CSV,
+    MEDIA_TYPES,
+    csv_header,
+    encode_cards,
+    encode_generate_response,
+)
+from .services.generator import (
+    MODE_SAMPLED,
+    MODE_TOP,
+    Card,
+    CombinationIndex,
+    GroupSampler,
+    generate_cards,
+    generate_ranked_cards,
 )
-from .security import verify_password
-from .services.data import HistoryCache, get_last_concurso
-from .services.generator import generate_cards
-from .services.rate_limit import RateLimiter
-from .services.scoring import compute_number_scores
+from .services.jobs import BacktestJob, BacktestJobManager
+from .services.rate_limit import BACKEND_MEMORY, BACKEND_SQLITE, RateLimiter, create_backend
+from .services.scoring import ScoreResult, compute_scores_from_draws
 
 logging.basicConfig(
     level=settings.log_level,
@@ -44,6 +96,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger("mega_facil")
 
+T = TypeVar("T")
+
 app = FastAPI(title="MEGA FACIL API", version="1.0.0")
 
 app.add_middleware(
@@ -53,14 +107,89 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.gzip_min_size > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.gzip_min_size)
+
+history_cache = HistoryCache(
+    settings.csv_path,
+    settings.history_check_interval,
+    settings.history_bin_path,
+)
+score_cache: VersionedCache[Tuple[ScoreResult, GroupSampler]] = VersionedCache(
+    settings.score_cache_size
+)
+enumeration_cache: VersionedCache[CombinationIndex] = VersionedCache(
+    settings.enumeration_cache_size
+)
+generate_executor = BoundedExecutor(
+    settings.generate_workers, settings.generate_max_queue, "generate"
+)
+db_executor = BoundedExecutor(settings.db_workers, settings.db_max_queue, "db")
+password_executor = BoundedExecutor(
+    settings.password_workers, settings.password_max_queue, "password", processes=True
+)
+backtest_executor = BoundedExecutor(
+    settings.backtest_workers, settings.backtest_max_queue, "backtest"
+)
+backtest_jobs = BacktestJobManager(settings.db_path, backtest_executor)
+ledger_writer = (
+    LedgerWriter(settings.db_path, settings.ledger_max_batch, settings.ledger_max_delay_ms)
+    if settings.ledger_group_commit
+    else None
+)
 
-history_cache = HistoryCache(settings.csv_path)
-rate_limiter = RateLimiter(settings.rate_limit_max_requests, settings.rate_limit_window_seconds)
+if settings.rate_limit_backend == BACKEND_SQLITE:
+    settings.rate_limit_db_path.parent.mkdir(parents=True, exist_ok=True)
+rate_limiter = RateLimiter(
+    settings.rate_limit_max_requests,
+    settings.rate_limit_window_seconds,
+    create_backend(
+        settings.rate_limit_backend,
+        settings.rate_limit_stripes,
+        lambda: get_pool(settings.rate_limit_db_path).connection(),
+        begin_immediate,
+    ),
+)
+
+register_cache_metrics(
+    {
+        "score": score_cache,
+        "enumeration": enumeration_cache,
+        "principal_id": principal_cache.by_id,
+        "principal_api_key": principal_cache.by_api_key,
+    }
+)
+register_executor_metrics([generate_executor, db_executor, password_executor, backtest_executor])
+registry.gauge_callback(
+    "mega_facil_history_version",
+    "Version of the history snapshot currently served.",
+    (),
+    lambda: {(): history_cache.version},
+)
+if ledger_writer is not None:
+    registry.counter_callback(
+        "mega_facil_ledger_commits_total",
+        "Transactions committed by the group-commit ledger writer.",
+        (),
+        lambda: {(): ledger_writer.stats()["commits"]},
+    )
+    registry.counter_callback(
+        "mega_facil_ledger_entries_total",
+        "Debit requests processed by the group-commit ledger writer.",
+        (),
+        lambda: {(): ledger_writer.stats()["entries"]},
+    )
 
 
 @app.on_event("startup")
 def startup() -> None:
+    password_executor.start()
+    configure_pool(settings.db_path, settings.db_synchronous)
     init_db(settings.db_path)
+    backtest_jobs.init_db()
+    backtest_jobs.start_heartbeat()
+    if settings.history_background_refresh:
+        history_cache.start_refresher()
     if settings.admin_username and settings.admin_password:
         existing = get_user_by_username(settings.db_path, settings.admin_username)
         if not existing:
@@ -69,6 +198,8 @@ def startup() -> None:
                 settings.admin_username,
                 settings.admin_password,
                 ROLE_ADMIN,
+                password_algorithm=settings.password_algorithm,
+                password_iterations=settings.password_iterations,
             )
             logger.info(
                 "admin_created username=%s id=%s api_key=%s",
@@ -78,19 +209,59 @@ def startup() -> None:
             )
 
 
+@app.on_event("shutdown")
+def shutdown() -> None:
+    history_cache.stop_refresher()
+    generate_executor.shutdown()
+    db_executor.shutdown()
+    password_executor.shutdown()
+    backtest_executor.shutdown(wait=False)
+    backtest_jobs.close()
+    if ledger_writer is not None:
+        ledger_writer.close()
+    rate_limiter.backend.close()
+    close_pools()
+
+
 @app.get("/health")
 def health() -> dict:
-    return {"status": "ok", "timestamp": int(time.time())}
+    return {
+        "status": "ok",
+        "timestamp": int(time.time()),
+        "history_version": history_cache.version,
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics(request: Request) -> PlainTextResponse:
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    authorization = request.headers.get("authorization", "")
+    if not settings.metrics_token or not secrets.compare_digest(
+        authorization, f"Bearer {settings.metrics_token}"
+    ):
+        _require_admin(request)
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.post("/auth/login", response_model=LoginResponse)
-def login(req: LoginRequest) -> LoginResponse:
-    user = get_user_by_username(settings.db_path, req.username)
+async def login(req: LoginRequest) -> LoginResponse:
+    user = await _offload(db_executor, get_user_by_username, settings.db_path, req.username)
     if not user or not user.is_active:
         raise HTTPException(status_code=401, detail="Credenciais inválidas.")
-    if not verify_password(req.password, user.password_salt, user.password_hash):
+    valid = await _offload(
+        password_executor,
+        verify_password,
+        req.password,
+        user.password_salt,
+        user.password_hash,
+    )
+    if not valid:
         raise HTTPException(status_code=401, detail="Credenciais inválidas.")
 
+    if needs_rehash(user.password_hash, settings.password_algorithm, settings.password_iterations):
+        await _rehash_password(user, req.password)
+
     return LoginResponse(
         id=user.id,
         username=user.username,
@@ -113,6 +284,8 @@ def admin_create_user(req: CreateUserRequest, request: Request) -> UserResponse:
         req.password,
         role,
         credits=req.credits,
+        password_algorithm=settings.password_algorithm,
+        password_iterations=settings.password_iterations,
     )
 
     logger.info(
@@ -132,6 +305,43 @@ def admin_create_user(req: CreateUserRequest, request: Request) -> UserResponse:
     )
 
 
+@app.get("/admin/users", response_model=UserPageResponse)
+def admin_list_users(
+    request: Request,
+    limit: int = Query(default=50, ge=1, le=USER_PAGE_MAX),
+    cursor: str | None = None,
+    role: str | None = None,
+    is_active: bool | None = None,
+) -> UserPageResponse:
+    _require_admin(request)
+    if role is not None:
+        role = role.lower()
+        if role not in VALID_ROLES:
+            raise HTTPException(status_code=400, detail="Role inválida.")
+
+    users, next_cursor = list_user_page(
+        settings.db_path,
+        limit,
+        _decode_user_cursor(cursor) if cursor else None,
+        role,
+        is_active,
+    )
+    return UserPageResponse(
+        users=[
+            UserSummaryResponse(
+                id=user.id,
+                username=user.username,
+                role=user.role,
+                credits=user.credits,
+                is_active=user.is_active,
+                created_at=user.created_at,
+            )
+            for user in users
+        ],
+        next_cursor=_encode_user_cursor(next_cursor) if next_cursor else None,
+    )
+
+
 @app.post("/admin/credits", response_model=CreditResponse)
 def admin_adjust_credits(req: CreditRequest, request: Request) -> CreditResponse:
     admin = _require_admin(request)
@@ -166,22 +376,248 @@ def admin_adjust_credits(req: CreditRequest, request: Request) -> CreditResponse
     return CreditResponse(user_id=user.id, credits=new_total)
 
 
+@app.post("/admin/users/status", response_model=UserStatusResponse)
+def admin_set_user_status(req: UserStatusRequest, request: Request) -> UserStatusResponse:
+    admin = _require_admin(request)
+
+    if not set_user_active(settings.db_path, req.user_id, req.is_active):
+        raise HTTPException(status_code=404, detail="Usuário não encontrado.")
+
+    logger.info(
+        "admin_set_user_status admin_id=%s user_id=%s is_active=%s",
+        admin.id,
+        req.user_id,
+        req.is_active,
+    )
+
+    return UserStatusResponse(user_id=req.user_id, is_active=req.is_active)
+
+
+@app.post("/admin/backtests", response_model=BacktestJobResponse)
+def admin_submit_backtest(req: BacktestRequest, request: Request) -> BacktestJobResponse:
+    admin = _require_admin(request)
+
+    try:
+        history = history_cache.get()
+    except (FileNotFoundError, ValueError) as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    if history.empty:
+        raise HTTPException(status_code=500, detail="CSV sem dados válidos.")
+
+    config = BacktestConfig(
+        req.window_size or settings.window_size,
+        req.cards_per_draw,
+        req.combinations_per_card,
+        req.seed if req.seed is not None else secrets.randbits(63),
+    )
+    try:
+        job = backtest_jobs.submit(history, config)
+    except ExecutorSaturated as exc:
+        raise HTTPException(
+            status_code=503,
+            detail="Fila de backtests cheia. Tente novamente mais tarde.",
+            headers={"Retry-After": str(settings.saturation_retry_after)},
+        ) from exc
+
+    logger.info(
+        "admin_submit_backtest admin_id=%s job_id=%s status=%s cached=%s params=%s",
+        admin.id,
+        job.id,
+        job.status,
+        job.cached,
+        config.to_dict(),
+    )
+
+    return _backtest_job_response(job)
+
+
+@app.get("/admin/backtests/{job_id}", response_model=BacktestJobResponse)
+def admin_get_backtest(job_id: str, request: Request) -> BacktestJobResponse:
+    _require_admin(request)
+
+    job = backtest_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Backtest não encontrado.")
+
+    return _backtest_job_response(job)
+
+
 @app.post("/generate", response_model=GenerateResponse)
-def generate(req: GenerateRequest, request: Request) -> GenerateResponse:
+async def generate(req: GenerateRequest, request: Request) -> Response:
+    started = time.perf_counter()
     client_ip = _get_client_ip(request)
+    user = await _authorize_generation(request, client_ip, req.user_id, req.pagamento_confirmado)
 
-    allowed, retry_after = rate_limiter.allow(client_ip)
-    if not allowed:
+    cost = req.cartoes * settings.credits_per_card
+    user = await _ensure_credits(user, cost)
+
+    window_size = req.window_size or settings.window_size
+
+    try:
+        history, body = await _offload(
+            generate_executor,
+            _build_generate_response,
+            window_size,
+            req.modo,
+            _resolve_seed(req),
+            req.cartoes,
+        )
+    except (FileNotFoundError, ValueError) as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+    try:
+        with STAGE_SECONDS.time("debit"):
+            new_total = await _debit(user.id, cost, "geracao_cartoes")
+    except ValueError as exc:
+        raise HTTPException(status_code=402, detail=str(exc)) from exc
+
+    last_concurso = history.last_concurso
+    logger.info(
+        "generation ip=%s user_id=%s cards=%s combos_per_card=%s window=%s mode=%s last_concurso=%s credits=%s",
+        client_ip,
+        req.user_id,
+        req.cartoes,
+        settings.combinations_per_card,
+        window_size,
+        req.modo,
+        last_concurso,
+        new_total,
+    )
+
+    REQUEST_SECONDS.observe(time.perf_counter() - started, "generate")
+    return Response(content=body, media_type="application/json")
+
+
+@app.post("/generate/bulk")
+async def generate_bulk(req: BulkGenerateRequest, request: Request) -> StreamingResponse:
+    client_ip = _get_client_ip(request)
+    user = await _authorize_generation(request, client_ip, req.user_id, req.pagamento_confirmado)
+    if user.role not in {ROLE_AFFILIATE, ROLE_ADMIN}:
+        raise HTTPException(status_code=403, detail="Geração em lote restrita a afiliados.")
+    if req.cartoes > settings.bulk_max_cards:
         raise HTTPException(
-            status_code=429,
-            detail="Rate limit excedido. Tente novamente mais tarde.",
-            headers={"Retry-After": str(retry_after)},
+            status_code=400,
+            detail=f"Máximo de {settings.bulk_max_cards} cartões por pedido.",
+        )
+
+    cost = req.cartoes * settings.credits_per_card
+    user = await _ensure_credits(user, cost)
+
+    window_size = req.window_size or settings.window_size
+    seed = req.seed if req.seed is not None else secrets.randbits(63)
+    start = req.offset
+    stop = req.offset + req.cartoes
+    first_chunk = start // settings.bulk_chunk_size
+    last_chunk = (stop - 1) // settings.bulk_chunk_size
+
+    try:
+        history = await _offload(generate_executor, history_cache.get)
+        if history.empty:
+            raise ValueError("CSV sem dados válidos.")
+        if req.modo == MODE_TOP:
+            capacity = await _offload(generate_executor, _ranked_capacity, history, window_size)
+            if stop > capacity:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"O modo top tem {capacity} cartões; offset + cartoes excede o ranking.",
+                )
+        first_lines = await _offload(
+            generate_executor,
+            _generate_bulk_chunk,
+            history,
+            window_size,
+            req.modo,
+            seed,
+            first_chunk,
+            start,
+            stop,
+            req.formato,
+        )
+    except (FileNotFoundError, ValueError) as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+    try:
+        new_total = await _debit(
+            user.id, _chunk_cost(first_chunk, start, stop), "geracao_cartoes_lote"
         )
+    except ValueError as exc:
+        raise HTTPException(status_code=402, detail=str(exc)) from exc
+
+    logger.info(
+        "bulk_generation ip=%s user_id=%s cards=%s offset=%s seed=%s window=%s mode=%s format=%s last_concurso=%s credits=%s",
+        client_ip,
+        user.id,
+        req.cartoes,
+        req.offset,
+        seed,
+        window_size,
+        req.modo,
+        req.formato,
+        history.last_concurso,
+        new_total,
+    )
 
-    if not req.pagamento_confirmado:
+    async def stream() -> AsyncIterator[bytes]:
+        if req.formato == FORMAT_CSV:
+            yield csv_header()
+        yield first_lines
+        for chunk in range(first_chunk + 1, last_chunk + 1):
+            try:
+                lines = await _run_when_available(
+                    generate_executor,
+                    settings.bulk_max_wait,
+                    _generate_bulk_chunk,
+                    history,
+                    window_size,
+                    req.modo,
+                    seed,
+                    chunk,
+                    start,
+                    stop,
+                    req.formato,
+                )
+                await _debit(user.id, _chunk_cost(chunk, start, stop), "geracao_cartoes_lote")
+            except (
+                ExecutorSaturated,
+                HTTPException,
+                RuntimeError,
+                ValueError,
+                sqlite3.Error,
+            ) as exc:
+                logger.warning(
+                    "bulk_generation_interrupted user_id=%s seed=%s delivered=%s error=%s",
+                    user.id,
+                    seed,
+                    min(chunk * settings.bulk_chunk_size, stop) - start,
+                    exc,
+                )
+                return
+            yield lines
+
+    return StreamingResponse(
+        stream(),
+        media_type=MEDIA_TYPES[req.formato],
+        headers={
+            "X-Seed": str(seed),
+            "X-Offset": str(start),
+            "X-Next-Offset": str(stop),
+        },
+    )
+
+
+async def _authorize_generation(
+    request: Request,
+    client_ip: str,
+    user_id: str,
+    payment_confirmed: bool,
+) -> UserRecord:
+    await _enforce_rate_limit(f"ip:{client_ip}")
+
+    if not payment_confirmed:
         raise HTTPException(status_code=403, detail="Pagamento não confirmado.")
 
-    user = get_user_by_id(settings.db_path, req.user_id)
+    with STAGE_SECONDS.time("user_lookup"):
+        user = await _offload(db_executor, principal_cache.get_by_id, settings.db_path, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado.")
     if not user.is_active:
@@ -196,70 +632,245 @@ def generate(req: GenerateRequest, request: Request) -> GenerateResponse:
     elif api_key and api_key != user.api_key:
         raise HTTPException(status_code=401, detail="API key inválida.")
 
-    cost = req.cartoes * settings.credits_per_card
-    if user.credits < cost:
-        raise HTTPException(status_code=402, detail="Créditos insuficientes.")
+    user_limit = settings.rate_limit_user_limits.get(
+        user.id, settings.rate_limit_role_limits.get(user.role)
+    )
+    if user_limit is not None:
+        await _enforce_rate_limit(f"user:{user.id}", user_limit)
 
-    try:
-        history_df = history_cache.get()
-    except (FileNotFoundError, ValueError) as exc:
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    return user
 
-    if history_df.empty:
-        raise HTTPException(status_code=500, detail="CSV sem dados válidos.")
 
-    window_size = req.window_size or settings.window_size
-    score_result = compute_number_scores(history_df, window_size)
+async def _ensure_credits(user: UserRecord, cost: int) -> UserRecord:
+    if user.credits >= cost:
+        return user
+    principal_cache.invalidate(settings.db_path, user.id)
+    refreshed = await _offload(db_executor, get_user_by_id, settings.db_path, user.id)
+    if not refreshed or refreshed.credits < cost:
+        raise HTTPException(status_code=402, detail="Créditos insuficientes.")
+    return refreshed
 
-    rng = np.random.default_rng(_resolve_seed(req))
 
+async def _rehash_password(user: UserRecord, password: str) -> None:
     try:
-        cards = generate_cards(
-            score_result.scores,
-            score_result.groups,
-            rng,
-            req.cartoes,
-            settings.combinations_per_card,
+        salt, digest = await password_executor.run(
+            hash_password,
+            password,
+            None,
+            settings.password_algorithm,
+            settings.password_iterations,
         )
-    except ValueError as exc:
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
-
-    try:
-        new_total = add_credits(
+        await db_executor.run(
+            update_password_hash,
             settings.db_path,
             user.id,
-            -cost,
-            "geracao_cartoes",
-            user.id,
+            user.password_hash,
+            salt,
+            digest,
         )
-    except ValueError as exc:
-        raise HTTPException(status_code=402, detail=str(exc)) from exc
+    except ExecutorSaturated:
+        return
+    except Exception:
+        logger.warning("password_rehash_failed user_id=%s", user.id, exc_info=True)
+        return
 
-    last_concurso = get_last_concurso(history_df)
     logger.info(
-        "generation ip=%s user_id=%s cards=%s combos_per_card=%s window=%s last_concurso=%s credits=%s",
-        client_ip,
-        req.user_id,
-        req.cartoes,
-        settings.combinations_per_card,
+        "password_rehashed user_id=%s algorithm=%s iterations=%s",
+        user.id,
+        settings.password_algorithm,
+        settings.password_iterations,
+    )
+
+
+async def _enforce_rate_limit(key: str, max_requests: Optional[int] = None) -> None:
+    with STAGE_SECONDS.time("rate_limit"):
+        if settings.rate_limit_backend == BACKEND_MEMORY:
+            allowed, retry_after = rate_limiter.allow(key, max_requests)
+        else:
+            allowed, retry_after = await _offload(
+                db_executor, rate_limiter.allow, key, max_requests
+            )
+    if not allowed:
+        RATE_LIMITED.inc(key.split(":", 1)[0])
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit excedido. Tente novamente mais tarde.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+def _build_generate_response(
+    window_size: int,
+    mode: str,
+    seed: Optional[int],
+    card_count: int,
+) -> Tuple[HistorySnapshot, bytes]:
+    with STAGE_SECONDS.time("history"):
+        history = history_cache.get()
+    if history.empty:
+        raise ValueError("CSV sem dados válidos.")
+
+    rng = np.random.default_rng(seed)
+    cards = _generate_cards(history, window_size, mode, rng, card_count)
+    with STAGE_SECONDS.time("serialization"):
+        body = encode_generate_response(cards)
+    return history, body
+
+
+def _generate_bulk_chunk(
+    history: HistorySnapshot,
+    window_size: int,
+    mode: str,
+    seed: int,
+    chunk: int,
+    start: int,
+    stop: int,
+    fmt: str,
+) -> bytes:
+    chunk_size = settings.bulk_chunk_size
+    chunk_start = chunk * chunk_size
+    if mode == MODE_TOP:
+        chunk_size = min(chunk_size, stop - chunk_start)
+    rng = np.random.default_rng([seed, chunk])
+    cards = _generate_cards(history, window_size, mode, rng, chunk_size, chunk_start)
+    return encode_cards(cards[max(start - chunk_start, 0) : stop - chunk_start], fmt)
+
+
+def _chunk_cost(chunk: int, start: int, stop: int) -> int:
+    chunk_start = chunk * settings.bulk_chunk_size
+    cards = min(stop, chunk_start + settings.bulk_chunk_size) - max(start, chunk_start)
+    return cards * settings.credits_per_card
+
+
+def _ranked_capacity(history: HistorySnapshot, window_size: int) -> int:
+    score_result, _ = score_cache.get_or_compute(
+        history.version, window_size, lambda: _score_history(history.draws, window_size)
+    )
+    index = enumeration_cache.get_or_compute(
+        history.version,
         window_size,
-        last_concurso,
-        new_total,
+        lambda: CombinationIndex.build(score_result.scores, score_result.groups),
     )
+    return len(index) // settings.combinations_per_card
 
-    response_cards = []
-    for card in cards:
-        combinations = [
-            CombinationResponse(
-                numeros=combo.numbers,
-                score=combo.score,
-                explicacao=combo.explanation,
+
+async def _debit(user_id: str, cost: int, reason: str) -> int:
+    task = asyncio.ensure_future(_apply_debit(user_id, cost, reason))
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        task.add_done_callback(lambda done: _log_orphaned_debit(done, user_id, cost, reason))
+        raise
+
+
+def _log_orphaned_debit(
+    task: "asyncio.Future[int]", user_id: str, cost: int, reason: str
+) -> None:
+    if task.cancelled() or task.exception() is not None:
+        return
+    logger.warning(
+        "debit_after_disconnect user_id=%s cost=%s reason=%s credits=%s",
+        user_id,
+        cost,
+        reason,
+        task.result(),
+    )
+
+
+async def _apply_debit(user_id: str, cost: int, reason: str) -> int:
+    if ledger_writer is not None:
+        return await asyncio.wrap_future(ledger_writer.submit(user_id, cost, reason, user_id))
+    return await _offload(
+        db_executor, debit_credits, settings.db_path, user_id, cost, reason, user_id
+    )
+
+
+async def _offload(executor: BoundedExecutor, fn: Callable[..., T], *args: Any) -> T:
+    try:
+        return await executor.run(fn, *args)
+    except ExecutorSaturated as exc:
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor ocupado. Tente novamente em instantes.",
+            headers={"Retry-After": str(settings.saturation_retry_after)},
+        ) from exc
+
+
+async def _run_when_available(
+    executor: BoundedExecutor, max_wait: float, fn: Callable[..., T], *args: Any
+) -> T:
+    deadline = time.monotonic() + max_wait
+    while True:
+        try:
+            return await executor.run(fn, *args)
+        except ExecutorSaturated:
+            if time.monotonic() + settings.saturation_retry_after > deadline:
+                raise
+            await asyncio.sleep(settings.saturation_retry_after)
+
+
+def _generate_cards(
+    history: HistorySnapshot,
+    window_size: int,
+    mode: str,
+    rng: np.random.Generator,
+    card_count: int,
+    start_index: int = 0,
+) -> List[Card]:
+    with STAGE_SECONDS.time("scoring"):
+        score_result, sampler = score_cache.get_or_compute(
+            history.version,
+            window_size,
+            lambda: _score_history(history.draws, window_size),
+        )
+
+    if mode == MODE_SAMPLED:
+        with STAGE_SECONDS.time("sampling"):
+            return generate_cards(
+                score_result.scores,
+                score_result.groups,
+                rng,
+                card_count,
+                settings.combinations_per_card,
+                sampler=sampler,
+                start_index=start_index,
             )
-            for combo in card.combinations
-        ]
-        response_cards.append(CardResponse(id=card.card_id, combinacoes=combinations))
 
-    return GenerateResponse(cartoes=response_cards)
+    with STAGE_SECONDS.time("enumeration"):
+        index = enumeration_cache.get_or_compute(
+            history.version,
+            window_size,
+            lambda: CombinationIndex.build(score_result.scores, score_result.groups),
+        )
+    with STAGE_SECONDS.time("sampling"):
+        return generate_ranked_cards(
+            index,
+            mode,
+            rng,
+            card_count,
+            settings.combinations_per_card,
+            start_index,
+        )
+
+
+def _score_history(draws: np.ndarray, window_size: int) -> Tuple[ScoreResult, GroupSampler]:
+    score_result = compute_scores_from_draws(draws, window_size)
+    return score_result, GroupSampler.from_score_result(score_result)
+
+
+def _backtest_job_response(job: BacktestJob) -> BacktestJobResponse:
+    return BacktestJobResponse(
+        id=job.id,
+        status=job.status,
+        progress=job.progress,
+        cached=job.cached,
+        history_digest=job.history_digest,
+        params=job.config.to_dict(),
+        result=job.result,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+    )
 
 
 def _resolve_seed(req: GenerateRequest) -> Optional[int]:
@@ -280,11 +891,27 @@ def _get_client_ip(request: Request) -> str:
     return "unknown"
 
 
+def _encode_user_cursor(cursor: UserCursor) -> str:
+    raw = json.dumps(list(cursor), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_user_cursor(token: str) -> UserCursor:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, user_id = json.loads(raw)
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="Cursor inválido.") from exc
+    if not isinstance(created_at, str) or not isinstance(user_id, str):
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
+    return created_at, user_id
+
+
 def _require_admin(request: Request):
     api_key = request.headers.get("x-api-key")
     if not api_key:
         raise HTTPException(status_code=401, detail="API key ausente.")
-    user = get_user_by_api_key(settings.db_path, api_key)
+    user = principal_cache.get_by_api_key(settings.db_path, api_key)
     if not user or not user.is_active:
         raise HTTPException(status_code=401, detail="API key inválida.")
     if user.role != ROLE_ADMIN:
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Protocol, Sequence, Tuple, TypeVar
+
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+Samples = Dict[Tuple[str, ...], float]
+M = TypeVar("M", bound="Counter | Histogram | CallbackMetric")
+
+
+class StatsSource(Protocol):
+    def stats(self) -> Dict[str, float]:
+        ...
+
+
+class NamedStatsSource(StatsSource, Protocol):
+    name: str
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values: Samples = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        lines = _header(self.name, self.help_text, "counter")
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, label_values)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0]
+                self._series[label_values] = series
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, *label_values: str) -> "_Timer":
+        return _Timer(self, label_values)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        lines = _header(self.name, self.help_text, "histogram")
+        for label_values, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _labels(self.label_names + ("le",), label_values + (_number(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        metric_type: str,
+        label_names: Sequence[str],
+        collect: Callable[[], Samples],
+    ) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.metric_type = metric_type
+        self.label_names = tuple(label_names)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = _header(self.name, self.help_text, self.metric_type)
+        for label_values, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_labels(self.label_names, label_values)} {_number(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Counter | Histogram | CallbackMetric] = {}
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def gauge_callback(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str],
+        collect: Callable[[], Samples],
+    ) -> CallbackMetric:
+        return self._register(CallbackMetric(name, help_text, "gauge", label_names, collect))
+
+    def counter_callback(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str],
+        collect: Callable[[], Samples],
+    ) -> CallbackMetric:
+        return self._register(CallbackMetric(name, help_text, "counter", label_names, collect))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        lines.append("")
+        return "\n".join(lines)
+
+    def _register(self, metric: M) -> M:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_label_values", "_started")
+
+    def __init__(self, histogram: Histogram, label_values: Tuple[str, ...]) -> None:
+        self._histogram = histogram
+        self._label_values = label_values
+        self._started = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self._histogram.observe(time.perf_counter() - self._started, *self._label_values)
+
+
+def register_cache_metrics(caches: Dict[str, StatsSource]) -> None:
+    def collect(field: str) -> Callable[[], Samples]:
+        return lambda: {(name,): cache.stats()[field] for name, cache in caches.items()}
+
+    def hit_ratio() -> Samples:
+        samples: Samples = {}
+        for name, cache in caches.items():
+            stats = cache.stats()
+            lookups = stats["hits"] + stats["misses"]
+            samples[(name,)] = stats["hits"] / lookups if lookups else 0.0
+        return samples
+
+    registry.counter_callback(
+        "mega_facil_cache_hits_total", "Cache hits.", ("cache",), collect("hits")
+    )
+    registry.counter_callback(
+        "mega_facil_cache_misses_total", "Cache misses.", ("cache",), collect("misses")
+    )
+    registry.counter_callback(
+        "mega_facil_cache_evictions_total", "Cache evictions.", ("cache",), collect("evictions")
+    )
+    registry.gauge_callback(
+        "mega_facil_cache_entries", "Entries currently cached.", ("cache",), collect("size")
+    )
+    registry.gauge_callback(
+        "mega_facil_cache_hit_ratio", "Cache hits over lookups.", ("cache",), hit_ratio
+    )
+
+
+def register_executor_metrics(executors: Iterable[NamedStatsSource]) -> None:
+    executors = list(executors)
+
+    def collect(field: str) -> Callable[[], Samples]:
+        return lambda: {(executor.name,): executor.stats()[field] for executor in executors}
+
+    registry.gauge_callback(
+        "mega_facil_executor_pending",
+        "Tasks running or queued per executor.",
+        ("executor",),
+        collect("pending"),
+    )
+    registry.gauge_callback(
+        "mega_facil_executor_queue_depth",
+        "Tasks waiting for a worker per executor.",
+        ("executor",),
+        collect("queue_depth"),
+    )
+    registry.counter_callback(
+        "mega_facil_executor_rejected_total",
+        "Tasks rejected because the executor queue was full.",
+        ("executor",),
+        collect("rejected"),
+    )
+    registry.counter_callback(
+        "mega_facil_executor_completed_total",
+        "Tasks completed per executor.",
+        ("executor",),
+        collect("completed"),
+    )
+    registry.gauge_callback(
+        "mega_facil_executor_avg_latency_seconds",
+        "Average submit-to-completion latency per executor.",
+        ("executor",),
+        lambda: {
+            (executor.name,): executor.stats()["avg_latency_ms"] / 1000 for executor in executors
+        },
+    )
+
+
+def _header(name: str, help_text: str, metric_type: str) -> List[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "mega_facil_stage_seconds",
+    "Time spent in each request stage.",
+    ("stage",),
+)
+REQUEST_SECONDS = registry.histogram(
+    "mega_facil_request_seconds",
+    "End-to-end handler latency.",
+    ("endpoint",),
+)
+SQLITE_LOCK_WAIT_SECONDS = registry.histogram(
+    "mega_facil_sqlite_lock_wait_seconds",
+    "Time spent waiting for the SQLite write lock (BEGIN IMMEDIATE).",
+)
+RATE_LIMITED = registry.counter(
+    "mega_facil_rate_limited_total",
+    "Requests rejected by the rate limiter.",
+    ("scope",),
+)
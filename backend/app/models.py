@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Literal
+
 from pydantic import BaseModel, Field, model_validator
 
 
@@ -22,6 +24,20 @@ class GenerateRequest(BaseModel):
     pagamento_confirmado: bool
     window_size: int | None = Field(default=None, ge=1, le=500)
     seed: int | None = None
+    modo: Literal["amostragem", "top", "estratificado"] = "amostragem"
+
+    model_config = {"extra": "forbid"}
+
+
+class BulkGenerateRequest(BaseModel):
+    cartoes: int = Field(..., ge=1)
+    user_id: str = Field(..., min_length=1)
+    pagamento_confirmado: bool
+    window_size: int | None = Field(default=None, ge=1, le=500)
+    seed: int | None = Field(default=None, ge=0)
+    offset: int = Field(default=0, ge=0)
+    modo: Literal["amostragem", "top", "estratificado"] = "amostragem"
+    formato: Literal["ndjson", "csv"] = "ndjson"
 
     model_config = {"extra": "forbid"}
 
@@ -56,6 +72,20 @@ class UserResponse(BaseModel):
     api_key: str
 
 
+class UserSummaryResponse(BaseModel):
+    id: str
+    username: str
+    role: str
+    credits: int
+    is_active: bool
+    created_at: str
+
+
+class UserPageResponse(BaseModel):
+    users: list[UserSummaryResponse]
+    next_cursor: str | None = None
+
+
 class CreditRequest(BaseModel):
     user_id: str | None = None
     username: str | None = None
@@ -72,3 +102,35 @@ class CreditRequest(BaseModel):
 class CreditResponse(BaseModel):
     user_id: str
     credits: int
+
+
+class UserStatusRequest(BaseModel):
+    user_id: str = Field(..., min_length=1)
+    is_active: bool
+
+
+class UserStatusResponse(BaseModel):
+    user_id: str
+    is_active: bool
+
+
+class BacktestRequest(BaseModel):
+    window_size: int | None = Field(default=None, ge=1, le=500)
+    cards_per_draw: int = Field(default=1, ge=1, le=20)
+    combinations_per_card: int = Field(default=3, ge=1, le=20)
+    seed: int | None = Field(default=None, ge=0)
+
+    model_config = {"extra": "forbid"}
+
+
+class BacktestJobResponse(BaseModel):
+    id: str
+    status: str
+    progress: float
+    cached: bool
+    history_digest: str
+    params: dict
+    result: dict | None = None
+    error: str | None = None
+    created_at: str
+    updated_at: str
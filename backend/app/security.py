@@ -5,29 +5,53 @@ import hmac
 import secrets
 from typing import Tuple
 
+DEFAULT_PASSWORD_ALGORITHM = "sha256"
+DEFAULT_PASSWORD_ITERATIONS = 120_000
+HASH_PREFIX = "pbkdf2_"
+LEGACY_PASSWORD_ALGORITHM = "sha256"
+LEGACY_PASSWORD_ITERATIONS = 120_000
 
-def hash_password(password: str, salt: bytes | None = None) -> Tuple[str, str]:
+
+def hash_password(
+    password: str,
+    salt: bytes | None = None,
+    algorithm: str = DEFAULT_PASSWORD_ALGORITHM,
+    iterations: int = DEFAULT_PASSWORD_ITERATIONS,
+) -> Tuple[str, str]:
     if salt is None:
         salt = secrets.token_bytes(16)
     digest = hashlib.pbkdf2_hmac(
-        "sha256",
+        algorithm,
         password.encode("utf-8"),
         salt,
-        120_000,
+        iterations,
     )
-    return salt.hex(), digest.hex()
+    return salt.hex(), f"{HASH_PREFIX}{algorithm}${iterations}${digest.hex()}"
 
 
 def verify_password(password: str, salt_hex: str, digest_hex: str) -> bool:
+    algorithm, iterations, expected = _parse_hash(digest_hex)
     salt = bytes.fromhex(salt_hex)
     digest = hashlib.pbkdf2_hmac(
-        "sha256",
+        algorithm,
         password.encode("utf-8"),
         salt,
-        120_000,
+        iterations,
     ).hex()
-    return hmac.compare_digest(digest, digest_hex)
+    return hmac.compare_digest(digest, expected)
+
+
+def needs_rehash(digest_hex: str, algorithm: str, iterations: int) -> bool:
+    current_algorithm, current_iterations, _ = _parse_hash(digest_hex)
+    return current_algorithm != algorithm or current_iterations != iterations
 
 
 def generate_api_key() -> str:
     return secrets.token_urlsafe(32)
+
+
+def _parse_hash(digest_hex: str) -> Tuple[str, int, str]:
+    if not digest_hex.startswith(HASH_PREFIX):
+        return LEGACY_PASSWORD_ALGORITHM, LEGACY_PASSWORD_ITERATIONS, digest_hex
+    scheme, iterations, digest = digest_hex.split("$", 2)
+    return scheme[len(HASH_PREFIX) :], int(iterations), digest
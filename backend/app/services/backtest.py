@@ -1,14 +1,34 @@
 from __future__ import annotations
 
-from collections import defaultdict
-from typing import Dict, List
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, Iterator, Tuple
 
 import numpy as np
 import pandas as pd
 
 from .data import NUMBER_COLUMNS
-from .generator import generate_cards
-from .scoring import compute_number_scores
+from .generator import GroupSampler, sample_combinations
+from .scoring import ScoreResult, score_from_counts
+
+
+@dataclass(frozen=True)
+class BacktestConfig:
+    window_size: int
+    cards_per_draw: int = 1
+    combinations_per_card: int = 3
+    seed: int | None = None
+
+    def without_seed(self) -> "BacktestConfig":
+        return BacktestConfig(self.window_size, self.cards_per_draw, self.combinations_per_card)
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+_SCORE_BUCKETS = ("0-20", "20-40", "40-60", "60-80", "80-100")
+_SCORE_BUCKET_EDGES = [20, 40, 60, 80]
+_BASELINE_CHUNK = 1 << 14
 
 
 def run_backtest(
@@ -18,7 +38,19 @@ def run_backtest(
     combinations_per_card: int = 3,
     seed: int | None = None,
 ) -> Dict[str, object]:
-    if history_df.empty or len(history_df) < 2:
+    draws = history_df[NUMBER_COLUMNS].to_numpy(dtype=np.int64)
+    return run_backtest_draws(draws, window_size, cards_per_draw, combinations_per_card, seed)
+
+
+def run_backtest_draws(
+    draws: np.ndarray,
+    window_size: int,
+    cards_per_draw: int = 1,
+    combinations_per_card: int = 3,
+    seed: int | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> Dict[str, object]:
+    if len(draws) < 2:
         return {
             "total_combinations": 0,
             "match_distribution": {},
@@ -27,68 +59,200 @@ def run_backtest(
         }
 
     rng = np.random.default_rng(seed)
-    match_distribution: Dict[int, int] = defaultdict(int)
-    baseline_distribution: Dict[int, int] = defaultdict(int)
-    score_buckets: Dict[str, Dict[str, float]] = defaultdict(lambda: {"count": 0, "avg_hits": 0.0})
+    steps = len(draws) - 1
+    per_draw = cards_per_draw * combinations_per_card
+    model_combos = np.empty((steps, per_draw, 6), dtype=np.int8)
+    model_scores = np.empty((steps, per_draw), dtype=float)
 
-    for idx in range(1, len(history_df)):
-        train_df = history_df.iloc[:idx]
-        actual_numbers = set(history_df.iloc[idx][NUMBER_COLUMNS].tolist())
+    scorer = IncrementalScorer(draws, window_size)
+    scorer.advance()
 
-        score_result = compute_number_scores(train_df, window_size)
-        cards = generate_cards(
+    for step in range(steps):
+        score_result = scorer.score()
+        scorer.advance()
+        sampler = GroupSampler.from_score_result(score_result)
+        combos = sample_combinations(
             score_result.scores,
             score_result.groups,
             rng,
             cards_per_draw,
             combinations_per_card,
-        )
+            sampler=sampler,
+        ).reshape(per_draw, 6)
+        model_combos[step] = combos
+        model_scores[step] = sampler.combo_scores(combos)
+        if progress is not None:
+            progress(step + 1, steps)
 
-        combinations = [combo for card in cards for combo in card.combinations]
+    targets = np.zeros((steps, 61), dtype=bool)
+    targets[np.arange(steps)[:, None], draws[1:]] = True
 
-        for combo in combinations:
-            hits = len(set(combo.numbers) & actual_numbers)
-            match_distribution[hits] += 1
-            bucket = _score_bucket(combo.score)
-            bucket_data = score_buckets[bucket]
-            bucket_data["count"] += 1
-            bucket_data["avg_hits"] += hits
+    model_hits = _count_hits(targets, np.arange(steps), model_combos)
+    baseline_hits = _random_baseline_hits(rng, targets, per_draw)
 
-        baseline_combos = _random_baseline(
-            rng,
-            len(combinations),
-        )
-        for combo_numbers in baseline_combos:
-            hits = len(set(combo_numbers) & actual_numbers)
-            baseline_distribution[hits] += 1
-
-    for bucket, data in score_buckets.items():
-        if data["count"]:
-            data["avg_hits"] = round(data["avg_hits"] / data["count"], 3)
+    bucket_index = np.digitize(model_scores.ravel(), _SCORE_BUCKET_EDGES)
+    bucket_counts = np.bincount(bucket_index, minlength=len(_SCORE_BUCKETS))
+    bucket_hits = np.bincount(
+        bucket_index, weights=model_hits.ravel(), minlength=len(_SCORE_BUCKETS)
+    )
+    score_buckets = {
+        _SCORE_BUCKETS[i]: {
+            "count": int(bucket_counts[i]),
+            "hits": int(bucket_hits[i]),
+            "avg_hits": round(float(bucket_hits[i]) / int(bucket_counts[i]), 3),
+        }
+        for i in range(len(_SCORE_BUCKETS))
+        if bucket_counts[i]
+    }
 
+    match_distribution = _distribution(model_hits)
     return {
         "total_combinations": sum(match_distribution.values()),
-        "match_distribution": dict(match_distribution),
-        "baseline_match_distribution": dict(baseline_distribution),
-        "score_buckets": dict(score_buckets),
+        "match_distribution": match_distribution,
+        "baseline_match_distribution": _distribution(baseline_hits),
+        "score_buckets": score_buckets,
+    }
+
+
+def run_backtest_sweep(
+    draws: np.ndarray,
+    configs: Iterable[BacktestConfig],
+    max_workers: int | None = None,
+) -> Iterator[Tuple[BacktestConfig, Dict[str, object], Dict[str, object]]]:
+    aggregates: Dict[BacktestConfig, Dict[str, object]] = {}
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_sweep_worker,
+        initargs=(draws,),
+    ) as pool:
+        futures = {pool.submit(_run_sweep_task, config): config for config in configs}
+        for future in as_completed(futures):
+            config = futures[future]
+            result = future.result()
+            key = config.without_seed()
+            aggregates[key] = merge_backtest_results(aggregates.get(key), result)
+            yield config, result, aggregates[key]
+
+
+def merge_backtest_results(
+    aggregate: Dict[str, object] | None, result: Dict[str, object]
+) -> Dict[str, object]:
+    if aggregate is None:
+        aggregate = {
+            "runs": 0,
+            "total_combinations": 0,
+            "match_distribution": {},
+            "baseline_match_distribution": {},
+            "score_buckets": {},
+        }
+
+    match_distribution = dict(aggregate["match_distribution"])
+    for hits, count in result["match_distribution"].items():
+        match_distribution[hits] = match_distribution.get(hits, 0) + count
+
+    baseline_distribution = dict(aggregate["baseline_match_distribution"])
+    for hits, count in result["baseline_match_distribution"].items():
+        baseline_distribution[hits] = baseline_distribution.get(hits, 0) + count
+
+    score_buckets = {bucket: dict(data) for bucket, data in aggregate["score_buckets"].items()}
+    for bucket, data in result["score_buckets"].items():
+        merged = score_buckets.setdefault(bucket, {"count": 0, "hits": 0, "avg_hits": 0.0})
+        merged["count"] += data["count"]
+        merged["hits"] += data["hits"]
+        if merged["count"]:
+            merged["avg_hits"] = round(merged["hits"] / merged["count"], 3)
+
+    return {
+        "runs": aggregate["runs"] + 1,
+        "total_combinations": aggregate["total_combinations"] + result["total_combinations"],
+        "match_distribution": match_distribution,
+        "baseline_match_distribution": baseline_distribution,
+        "score_buckets": score_buckets,
     }
 
 
-def _random_baseline(rng: np.random.Generator, total: int) -> List[List[int]]:
-    baseline = []
-    for _ in range(total):
-        numbers = rng.choice(60, size=6, replace=False) + 1
-        baseline.append(sorted(numbers.tolist()))
-    return baseline
-
-
-def _score_bucket(score: float) -> str:
-    if score >= 80:
-        return "80-100"
-    if score >= 60:
-        return "60-80"
-    if score >= 40:
-        return "40-60"
-    if score >= 20:
-        return "20-40"
-    return "0-20"
+_sweep_draws: np.ndarray | None = None
+
+
+def _init_sweep_worker(draws: np.ndarray) -> None:
+    global _sweep_draws
+    _sweep_draws = draws
+
+
+def _run_sweep_task(config: BacktestConfig) -> Dict[str, object]:
+    return run_backtest_draws(
+        _sweep_draws,
+        config.window_size,
+        config.cards_per_draw,
+        config.combinations_per_card,
+        config.seed,
+    )
+
+
+class IncrementalScorer:
+    def __init__(self, draws: np.ndarray, window_size: int) -> None:
+        self._draws = draws
+        self._window_size = window_size
+        self._total_counts = np.zeros(61, dtype=np.int64)
+        self._recent_counts = np.zeros(61, dtype=np.int64)
+        self._last_seen = np.full(61, -1, dtype=np.int64)
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def advance(self) -> None:
+        idx = self._size
+        row = self._draws[idx]
+        self._total_counts[row] += 1
+        if self._window_size > 0:
+            self._recent_counts[row] += 1
+            if idx >= self._window_size:
+                self._recent_counts[self._draws[idx - self._window_size]] -= 1
+        self._last_seen[row] = idx
+        self._size += 1
+
+    def score(self) -> ScoreResult:
+        last_seen = self._last_seen[1:]
+        seen = last_seen >= 0
+        recency = np.where(seen, self._size - 1 - last_seen, 0)
+        max_seen = int(recency[seen].max()) if seen.any() else 0
+        recency[~seen] = max_seen + 1
+
+        return score_from_counts(
+            self._total_counts[1:],
+            self._recent_counts[1:],
+            recency,
+        )
+
+
+def _count_hits(targets: np.ndarray, rows: np.ndarray, combos: np.ndarray) -> np.ndarray:
+    row_index = rows.reshape(rows.shape + (1,) * (combos.ndim - rows.ndim))
+    return targets[row_index, combos].sum(axis=-1)
+
+
+def _random_baseline(rng: np.random.Generator, total: int) -> np.ndarray:
+    combos = np.empty((total, 6), dtype=np.int8)
+    for column, upper in enumerate(range(60 - 6, 60)):
+        candidate = rng.integers(0, upper + 1, size=total, dtype=np.int8)
+        taken = (combos[:, :column] == candidate[:, None]).any(axis=1)
+        combos[:, column] = np.where(taken, upper, candidate)
+    return combos + 1
+
+
+def _random_baseline_hits(
+    rng: np.random.Generator, targets: np.ndarray, per_draw: int
+) -> np.ndarray:
+    rows = np.repeat(np.arange(len(targets)), per_draw)
+    hits = np.empty(len(rows), dtype=np.int64)
+    for start in range(0, len(rows), _BASELINE_CHUNK):
+        chunk_rows = rows[start : start + _BASELINE_CHUNK]
+        combos = _random_baseline(rng, len(chunk_rows))
+        hits[start : start + len(chunk_rows)] = _count_hits(targets, chunk_rows, combos)
+    return hits
+
+
+def _distribution(hits: np.ndarray) -> Dict[int, int]:
+    counts = np.bincount(hits.ravel(), minlength=7)
+    return {hits_value: int(count) for hits_value, count in enumerate(counts) if count}
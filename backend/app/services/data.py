@@ -1,64 +1,354 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
+import hashlib
+import logging
+import os
 from pathlib import Path
+import struct
 import threading
+import time
+from typing import Tuple
+
+import numpy as np
 import pandas as pd
 
 REQUIRED_COLUMNS = ["concurso", "n1", "n2", "n3", "n4", "n5", "n6"]
 NUMBER_COLUMNS = ["n1", "n2", "n3", "n4", "n5", "n6"]
+CSV_DTYPES = {col: "int64" for col in REQUIRED_COLUMNS}
+
+REJECT_INVALID_VALUE = "invalid_value"
+REJECT_INVALID_CONCURSO = "invalid_concurso"
+REJECT_OUT_OF_RANGE = "out_of_range"
+REJECT_DUPLICATE_NUMBERS = "duplicate_numbers"
+REJECT_DUPLICATE_CONCURSO = "duplicate_concurso"
+_REJECT_REASONS = np.array(
+    [
+        "",
+        REJECT_INVALID_VALUE,
+        REJECT_INVALID_CONCURSO,
+        REJECT_OUT_OF_RANGE,
+        REJECT_DUPLICATE_NUMBERS,
+        REJECT_DUPLICATE_CONCURSO,
+    ]
+)
+
+_MAX_CONCURSO = np.iinfo(np.int32).max
+
+HISTORY_MAGIC = b"MFH1"
+HISTORY_FORMAT_VERSION = 1
+_HISTORY_HEADER = struct.Struct("<4sHHII")
+_CONCURSO_DTYPE = np.dtype("<i4")
+
+logger = logging.getLogger("mega_facil.data")
 
 
 def load_history(csv_path: Path) -> pd.DataFrame:
+    df, rejected = load_history_with_report(csv_path)
+    if not rejected.empty:
+        counts = rejected["reason"].value_counts().sort_index()
+        logger.warning(
+            "history_rows_rejected path=%s total=%s %s",
+            csv_path,
+            len(rejected),
+            " ".join(f"{reason}={count}" for reason, count in counts.items()),
+        )
+    return df
+
+
+def load_history_with_report(csv_path: Path) -> Tuple[pd.DataFrame, pd.DataFrame]:
     if not csv_path.exists():
         raise FileNotFoundError(f"CSV not found: {csv_path}")
 
-    df = pd.read_csv(csv_path)
-    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    header = pd.read_csv(csv_path, nrows=0)
+    missing = [col for col in REQUIRED_COLUMNS if col not in header.columns]
     if missing:
         raise ValueError(f"Missing columns in CSV: {', '.join(missing)}")
 
-    df = df[REQUIRED_COLUMNS].copy()
+    raw_df = _read_numeric(csv_path)
+    blank = raw_df[REQUIRED_COLUMNS].isna().all(axis=1).to_numpy()
+    return validate_history(raw_df[~blank])
 
-    for col in REQUIRED_COLUMNS:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
 
-    df = df.dropna()
-    df[REQUIRED_COLUMNS] = df[REQUIRED_COLUMNS].astype(int)
+def validate_history(raw_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    values = raw_df[REQUIRED_COLUMNS].to_numpy(dtype=float)
+    concursos = np.trunc(values[:, 0])
+    numbers = np.trunc(values[:, 1:])
 
-    df = df[df["concurso"] > 0]
+    reason_codes = np.zeros(len(values), dtype=np.int8)
 
-    numbers_df = df[NUMBER_COLUMNS]
-    valid_range = numbers_df.apply(lambda row: row.between(1, 60).all(), axis=1)
-    no_duplicates = numbers_df.apply(lambda row: len(set(row)) == 6, axis=1)
+    invalid_value = np.isnan(values).any(axis=1)
+    _mark(reason_codes, invalid_value, 1)
 
-    df = df[valid_range & no_duplicates]
-    df = df.drop_duplicates(subset=["concurso"], keep="last")
-    df = df.sort_values("concurso").reset_index(drop=True)
+    invalid_concurso = (concursos <= 0) | (concursos > _MAX_CONCURSO)
+    _mark(reason_codes, invalid_concurso, 2)
 
-    return df
+    out_of_range = ((numbers < 1) | (numbers > 60)).any(axis=1)
+    _mark(reason_codes, out_of_range, 3)
+
+    sorted_numbers = np.sort(numbers, axis=1)
+    duplicate_numbers = (np.diff(sorted_numbers, axis=1) == 0).any(axis=1)
+    _mark(reason_codes, duplicate_numbers, 4)
+
+    valid = reason_codes == 0
+    superseded = np.zeros(len(values), dtype=bool)
+    superseded[valid] = pd.Series(concursos[valid]).duplicated(keep="last").to_numpy()
+    _mark(reason_codes, superseded, 5)
+    valid &= ~superseded
+
+    df = pd.DataFrame(numbers[valid].astype(np.int8), columns=NUMBER_COLUMNS)
+    df.insert(0, "concurso", concursos[valid].astype(np.int64))
+    df = df.sort_values("concurso", kind="stable").reset_index(drop=True)
+
+    rejected_rows = ~valid
+    rejected = pd.DataFrame(
+        {
+            "line": raw_df.index.to_numpy()[rejected_rows] + 2,
+            "concurso": raw_df["concurso"].to_numpy()[rejected_rows],
+            "reason": _REJECT_REASONS[reason_codes[rejected_rows]],
+        }
+    )
+
+    return df, rejected
+
+
+def _read_numeric(csv_path: Path) -> pd.DataFrame:
+    try:
+        return pd.read_csv(
+            csv_path, usecols=REQUIRED_COLUMNS, dtype=CSV_DTYPES, skip_blank_lines=False
+        )
+    except (ValueError, OverflowError):
+        df = pd.read_csv(csv_path, usecols=REQUIRED_COLUMNS, dtype=str, skip_blank_lines=False)
+        for col in REQUIRED_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+        return df
+
+
+def _mark(reason_codes: np.ndarray, mask: np.ndarray, code: int) -> None:
+    reason_codes[mask & (reason_codes == 0)] = code
+
+
+def write_history_binary(path: Path, df: pd.DataFrame) -> None:
+    concursos = df["concurso"].to_numpy(dtype=_CONCURSO_DTYPE)
+    draws = np.ascontiguousarray(df[NUMBER_COLUMNS].to_numpy(dtype=np.uint8))
+    header = _HISTORY_HEADER.pack(
+        HISTORY_MAGIC,
+        HISTORY_FORMAT_VERSION,
+        len(NUMBER_COLUMNS),
+        len(concursos),
+        0,
+    )
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as handle:
+        handle.write(header)
+        handle.write(concursos.tobytes())
+        handle.write(draws.tobytes())
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_history_binary(path: Path) -> Tuple[np.ndarray, np.ndarray]:
+    if not path.exists():
+        raise FileNotFoundError(f"History file not found: {path}")
+
+    with open(path, "rb") as handle:
+        header = handle.read(_HISTORY_HEADER.size)
+    if len(header) < _HISTORY_HEADER.size:
+        raise ValueError(f"Invalid history file: {path}")
+
+    magic, version, columns, count, _ = _HISTORY_HEADER.unpack(header)
+    if magic != HISTORY_MAGIC or version != HISTORY_FORMAT_VERSION:
+        raise ValueError(f"Unsupported history file format: {path}")
+    if columns != len(NUMBER_COLUMNS):
+        raise ValueError(f"Invalid history file: {path}")
+
+    concursos_offset = _HISTORY_HEADER.size
+    draws_offset = concursos_offset + count * _CONCURSO_DTYPE.itemsize
+    expected_size = draws_offset + count * columns
+    if path.stat().st_size != expected_size:
+        raise ValueError(f"Truncated history file: {path}")
+    if count == 0:
+        return np.empty(0, dtype=_CONCURSO_DTYPE), np.empty((0, columns), dtype=np.uint8)
+
+    concursos = np.memmap(path, dtype=_CONCURSO_DTYPE, mode="r", offset=concursos_offset, shape=(count,))
+    draws = np.memmap(path, dtype=np.uint8, mode="r", offset=draws_offset, shape=(count, columns))
+    return np.asarray(concursos), np.asarray(draws)
+
+
+@dataclass(frozen=True)
+class HistorySnapshot:
+    concursos: np.ndarray
+    draws: np.ndarray
+    version: int
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, version: int) -> "HistorySnapshot":
+        concursos = np.ascontiguousarray(df["concurso"].to_numpy(dtype=np.int32))
+        draws = np.ascontiguousarray(df[NUMBER_COLUMNS].to_numpy(dtype=np.int8))
+        return cls.from_arrays(concursos, draws, version)
+
+    @classmethod
+    def from_arrays(
+        cls, concursos: np.ndarray, draws: np.ndarray, version: int
+    ) -> "HistorySnapshot":
+        concursos = concursos.astype(np.int32, copy=False)
+        draws = draws.view(np.int8)
+        concursos.flags.writeable = False
+        draws.flags.writeable = False
+        return cls(concursos=concursos, draws=draws, version=version)
+
+    def __len__(self) -> int:
+        return len(self.concursos)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.concursos) == 0
+
+    @property
+    def last_concurso(self) -> int | None:
+        if self.empty:
+            return None
+        return int(self.concursos[-1])
+
+    @property
+    def digest(self) -> str:
+        hasher = hashlib.sha256()
+        hasher.update(np.ascontiguousarray(self.concursos, dtype="<i4").tobytes())
+        hasher.update(np.ascontiguousarray(self.draws, dtype=np.int8).tobytes())
+        return hasher.hexdigest()
 
 
 class HistoryCache:
-    def __init__(self, csv_path: Path) -> None:
+    def __init__(
+        self,
+        csv_path: Path,
+        check_interval: float = 1.0,
+        binary_path: Path | None = None,
+    ) -> None:
         self.csv_path = csv_path
+        self.binary_path = binary_path
+        self.check_interval = check_interval
         self._lock = threading.Lock()
-        self._df: pd.DataFrame | None = None
-        self._mtime: float | None = None
+        self._snapshot: HistorySnapshot | None = None
+        self._stamp: Tuple[Path, float] | None = None
+        self._failed_stamp: Tuple[Path, float | None] | None = None
+        self._stale_binary: Tuple[float, float] | None = None
+        self._next_check = 0.0
+        self._stop = threading.Event()
+        self._refresher: threading.Thread | None = None
+
+    @property
+    def version(self) -> int:
+        snapshot = self._snapshot
+        return snapshot.version if snapshot is not None else 0
+
+    def get(self) -> HistorySnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.refresh()
+            return self._snapshot
+        if self._refresher is None and time.monotonic() >= self._next_check:
+            self.refresh(blocking=False)
+            return self._snapshot
+        return snapshot
+
+    def refresh(self, blocking: bool = True) -> bool:
+        if not self._lock.acquire(blocking=blocking):
+            return False
+        try:
+            self._next_check = time.monotonic() + self.check_interval
+            stamp = None
+            try:
+                stamp = self._source_stamp()
+                if self._snapshot is not None and stamp in (self._stamp, self._failed_stamp):
+                    return False
+                snapshot = self._load(stamp[0], self.version + 1)
+            except (OSError, ValueError) as exc:
+                failed = stamp or (self.csv_path, None)
+                if failed != self._failed_stamp:
+                    self._failed_stamp = failed
+                    logger.warning(
+                        "history_reload_failed version=%s source=%s error=%s",
+                        self.version,
+                        failed[0],
+                        exc,
+                    )
+                if self._snapshot is None:
+                    raise
+                return False
+            self._stamp = stamp
+            self._failed_stamp = None
+            self._snapshot = snapshot
+            logger.info(
+                "history_loaded version=%s rows=%s source=%s",
+                snapshot.version,
+                len(snapshot),
+                stamp[0],
+            )
+            return True
+        finally:
+            self._lock.release()
+
+    def start_refresher(self) -> None:
+        if self._refresher is not None:
+            return
+        self._stop.clear()
+        self._refresher = threading.Thread(
+            target=self._refresh_loop, name="history-refresher", daemon=True
+        )
+        self._refresher.start()
+
+    def stop_refresher(self) -> None:
+        refresher = self._refresher
+        if refresher is None:
+            return
+        self._stop.set()
+        refresher.join()
+        self._refresher = None
 
-    def get(self) -> pd.DataFrame:
-        with self._lock:
-            if not self.csv_path.exists():
-                raise FileNotFoundError(f"CSV not found: {self.csv_path}")
+    def _refresh_loop(self) -> None:
+        failed: Tuple[type, str] | None = None
+        while True:
+            try:
+                self.refresh()
+                failed = None
+            except (OSError, ValueError):
+                pass
+            except Exception as exc:
+                if (type(exc), str(exc)) != failed:
+                    failed = (type(exc), str(exc))
+                    logger.exception("history_load_failed")
+            if self._stop.wait(self.check_interval):
+                return
 
-            mtime = self.csv_path.stat().st_mtime
-            if self._df is None or self._mtime != mtime:
-                self._df = load_history(self.csv_path)
-                self._mtime = mtime
+    def _source_stamp(self) -> Tuple[Path, float]:
+        csv_mtime = _mtime(self.csv_path)
+        binary_mtime = _mtime(self.binary_path) if self.binary_path is not None else None
+        if binary_mtime is not None:
+            if csv_mtime is None or binary_mtime >= csv_mtime:
+                return self.binary_path, binary_mtime
+            if self._stale_binary != (binary_mtime, csv_mtime):
+                self._stale_binary = (binary_mtime, csv_mtime)
+                logger.warning(
+                    "history_binary_stale binary=%s csv=%s loading=csv",
+                    self.binary_path,
+                    self.csv_path,
+                )
+        if csv_mtime is None:
+            raise FileNotFoundError(f"CSV not found: {self.csv_path}")
+        return self.csv_path, csv_mtime
 
-            return self._df.copy()
+    def _load(self, source: Path, version: int) -> HistorySnapshot:
+        if source == self.binary_path:
+            concursos, draws = load_history_binary(source)
+            return HistorySnapshot.from_arrays(concursos, draws, version)
+        return HistorySnapshot.from_frame(load_history(source), version)
 
 
-def get_last_concurso(df: pd.DataFrame) -> int | None:
-    if df.empty:
+def _mtime(path: Path) -> float | None:
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
         return None
-    return int(df["concurso"].iloc[-1])
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+import threading
+import time
+from typing import Any, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+PROCESS_START_METHODS = ("forkserver", "spawn")
+
+
+class ExecutorSaturated(RuntimeError):
+    pass
+
+
+class BoundedExecutor:
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue: int,
+        name: str,
+        processes: bool = False,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.name = name
+        self.processes = processes
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self.rejected = 0
+        self.completed = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self._pending - self.max_workers, 0)
+
+    def start(self) -> None:
+        with self._lock:
+            executor = self._start()
+        if self.processes:
+            for future in [executor.submit(_warm_up) for _ in range(self.max_workers)]:
+                future.result()
+
+    def submit(self, fn: Callable[..., T], *args: Any) -> "Future[T]":
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturated(f"{self.name} executor saturated")
+            self._pending += 1
+            executor = self._start()
+        submitted = time.perf_counter()
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            self._task_done(None, submitted)
+            raise
+        future.add_done_callback(lambda done: self._task_done(done, submitted))
+        return future
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            average = self._latency_total / self.completed if self.completed else 0.0
+            return {
+                "workers": self.max_workers,
+                "pending": self._pending,
+                "queue_depth": max(self._pending - self.max_workers, 0),
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "avg_latency_ms": round(average * 1000, 2),
+                "max_latency_ms": round(self._latency_max * 1000, 2),
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _start(self) -> Executor:
+        if self._executor is None:
+            if self.processes:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=_process_context()
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=self.name
+                )
+        return self._executor
+
+    def _task_done(self, future: "Future[Any] | None", submitted: float) -> None:
+        latency = time.perf_counter() - submitted
+        with self._lock:
+            self._pending -= 1
+            if future is not None:
+                self.completed += 1
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+
+
+def _process_context() -> multiprocessing.context.BaseContext:
+    available = multiprocessing.get_all_start_methods()
+    method = next(name for name in PROCESS_START_METHODS if name in available)
+    return multiprocessing.get_context(method)
+
+
+def _warm_up() -> None:
+    return None
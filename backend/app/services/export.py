@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import csv
+from functools import lru_cache
+import io
+import json
+from typing import List
+
+from .generator import Card
+
+FORMAT_NDJSON = "ndjson"
+FORMAT_CSV = "csv"
+
+MEDIA_TYPES = {
+    FORMAT_NDJSON: "application/x-ndjson",
+    FORMAT_CSV: "text/csv; charset=utf-8",
+}
+
+CSV_HEADER = ("id", "combinacao", "n1", "n2", "n3", "n4", "n5", "n6", "score")
+
+
+def encode_cards(cards: List[Card], fmt: str) -> bytes:
+    if fmt == FORMAT_NDJSON:
+        return encode_ndjson(cards)
+    if fmt == FORMAT_CSV:
+        return encode_csv(cards)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def encode_generate_response(cards: List[Card]) -> bytes:
+    return ('{"cartoes":[' + ",".join(map(_encode_card, cards)) + "]}").encode("utf-8")
+
+
+def encode_ndjson(cards: List[Card]) -> bytes:
+    lines = [_encode_card(card) for card in cards]
+    lines.append("")
+    return "\n".join(lines).encode("utf-8")
+
+
+def encode_csv(cards: List[Card]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for card in cards:
+        for position, combo in enumerate(card.combinations, start=1):
+            writer.writerow([card.card_id, position, *combo.numbers, combo.score])
+    return buffer.getvalue().encode("utf-8")
+
+
+def csv_header() -> bytes:
+    return (",".join(CSV_HEADER) + "\n").encode("utf-8")
+
+
+def _encode_card(card: Card) -> str:
+    combinations = ",".join(
+        '{"numeros":[%s],"score":%r,"explicacao":%s}'
+        % (",".join(map(str, combo.numbers)), combo.score, _encode_text(combo.explanation))
+        for combo in card.combinations
+    )
+    return '{"id":%s,"combinacoes":[%s]}' % (json.dumps(card.card_id), combinations)
+
+
+@lru_cache(maxsize=16)
+def _encode_text(text: str) -> str:
+    return json.dumps(text, ensure_ascii=False)
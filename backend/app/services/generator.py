@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 import numpy as np
 
+from .scoring import ScoreResult
+
 EXPLANATION_TEXT = (
     "Combinação formada por 2 números do Grupo A, 2 do Grupo B e 2 do Grupo C, "
     "priorizando o score do modelo com base em análise estatística como ferramenta auxiliar."
@@ -24,82 +26,249 @@ class Card:
     combinations: List[Combination]
 
 
+GROUP_STRUCTURE = (("A", 2), ("B", 2), ("C", 2))
+MAX_SAMPLING_ROUNDS = 20
+
+_RANKING_CHUNK = 1 << 16
+
+MODE_SAMPLED = "amostragem"
+MODE_TOP = "top"
+MODE_STRATIFIED = "estratificado"
+
+
+@dataclass(frozen=True)
+class GroupSampler:
+    group_numbers: Tuple[np.ndarray, ...]
+    group_log_weights: Tuple[np.ndarray, ...]
+    score_lookup: np.ndarray
+
+    @classmethod
+    def from_scores(
+        cls, scores: Dict[int, float], groups: Dict[str, List[int]]
+    ) -> "GroupSampler":
+        score_lookup = np.zeros(61, dtype=float)
+        for num, value in scores.items():
+            score_lookup[num] = value
+        return cls._from_lookup(score_lookup, groups)
+
+    @classmethod
+    def from_score_result(cls, score_result: ScoreResult) -> "GroupSampler":
+        score_lookup = np.concatenate(([0.0], score_result.score_array))
+        return cls._from_lookup(score_lookup, score_result.groups)
+
+    @classmethod
+    def _from_lookup(
+        cls, score_lookup: np.ndarray, groups: Dict[str, List[int]]
+    ) -> "GroupSampler":
+        group_numbers = []
+        group_log_weights = []
+        for name, count in GROUP_STRUCTURE:
+            numbers = np.array(groups[name], dtype=np.int64)
+            weights = score_lookup[numbers]
+            if weights.sum() <= 0:
+                weights = np.ones_like(weights)
+            with np.errstate(divide="ignore"):
+                group_log_weights.append(np.log(weights / weights.sum()))
+            group_numbers.append(numbers)
+
+        return cls(
+            group_numbers=tuple(group_numbers),
+            group_log_weights=tuple(group_log_weights),
+            score_lookup=score_lookup,
+        )
+
+    def sample(self, rng: np.random.Generator, size: Tuple[int, ...]) -> np.ndarray:
+        parts = []
+        for numbers, log_weights, (_, count) in zip(
+            self.group_numbers, self.group_log_weights, GROUP_STRUCTURE
+        ):
+            keys = log_weights + rng.gumbel(size=size + (len(numbers),))
+            picked = np.argpartition(-keys, count - 1, axis=-1)[..., :count]
+            parts.append(numbers[picked])
+        combos = np.concatenate(parts, axis=-1)
+        combos.sort(axis=-1)
+        return combos
+
+    def combo_scores(self, combos: np.ndarray) -> np.ndarray:
+        return np.round(self.score_lookup[combos].mean(axis=-1) * 100, 2)
+
+
+@dataclass(frozen=True)
+class CombinationIndex:
+    group_pairs: Tuple[np.ndarray, ...]
+    ranked: np.ndarray
+    score_lookup: np.ndarray
+
+    @classmethod
+    def build(cls, scores: Dict[int, float], groups: Dict[str, List[int]]) -> "CombinationIndex":
+        score_lookup = np.zeros(61, dtype=float)
+        for num, value in scores.items():
+            score_lookup[num] = value
+
+        group_pairs = []
+        pair_sums = []
+        for name, count in GROUP_STRUCTURE:
+            numbers = np.array(groups[name], dtype=np.uint8)
+            first, second = np.triu_indices(len(numbers), k=1)
+            pairs = np.stack([numbers[first], numbers[second]], axis=1)
+            pairs.flags.writeable = False
+            group_pairs.append(pairs)
+            pair_sums.append(score_lookup[pairs].sum(axis=1))
+
+        totals = (
+            pair_sums[0][:, None, None] + pair_sums[1][None, :, None] + pair_sums[2][None, None, :]
+        )
+        order = np.argsort(-totals.ravel(), kind="stable")
+        del totals
+
+        shape = tuple(len(pairs) for pairs in group_pairs)
+        ranked = np.empty((len(order), len(shape)), dtype=np.uint8)
+        for start in range(0, len(order), _RANKING_CHUNK):
+            chunk = order[start : start + _RANKING_CHUNK]
+            ranked[start : start + len(chunk)] = np.stack(np.unravel_index(chunk, shape), axis=1)
+        ranked.flags.writeable = False
+
+        return cls(group_pairs=tuple(group_pairs), ranked=ranked, score_lookup=score_lookup)
+
+    def __len__(self) -> int:
+        return len(self.ranked)
+
+    def combinations(self, positions: np.ndarray) -> np.ndarray:
+        rows = self.ranked[positions]
+        parts = [pairs[rows[..., i]] for i, pairs in enumerate(self.group_pairs)]
+        combos = np.concatenate(parts, axis=-1).astype(np.int64)
+        combos.sort(axis=-1)
+        return combos
+
+    def combo_scores(self, combos: np.ndarray) -> np.ndarray:
+        return np.round(self.score_lookup[combos].mean(axis=-1) * 100, 2)
+
+
 def generate_cards(
     scores: Dict[int, float],
     groups: Dict[str, List[int]],
     rng: np.random.Generator,
     card_count: int,
     combinations_per_card: int,
+    sampler: GroupSampler | None = None,
+    start_index: int = 0,
 ) -> List[Card]:
+    if sampler is None:
+        sampler = GroupSampler.from_scores(scores, groups)
+
+    combos = sample_combinations(
+        scores, groups, rng, card_count, combinations_per_card, sampler=sampler
+    )
+    return _build_cards(combos, sampler.combo_scores(combos), start_index)
+
+
+def sample_combinations(
+    scores: Dict[int, float],
+    groups: Dict[str, List[int]],
+    rng: np.random.Generator,
+    card_count: int,
+    combinations_per_card: int,
+    sampler: GroupSampler | None = None,
+) -> np.ndarray:
     if len(groups.get("A", [])) < 2 or len(groups.get("B", [])) < 2 or len(groups.get("C", [])) < 2:
         raise ValueError("Groups A, B, and C must have at least 2 numbers each.")
 
+    if sampler is None:
+        sampler = GroupSampler.from_scores(scores, groups)
+
+    return _sample_unique_combinations(sampler, rng, card_count, combinations_per_card)
+
+
+def generate_ranked_cards(
+    index: CombinationIndex,
+    mode: str,
+    rng: np.random.Generator,
+    card_count: int,
+    combinations_per_card: int,
+    start_index: int = 0,
+) -> List[Card]:
+    total = card_count * combinations_per_card
+    if total > len(index):
+        raise ValueError("Not enough combinations for the requested cards.")
+
+    if mode == MODE_TOP:
+        first = start_index * combinations_per_card
+        if first + total > len(index):
+            raise ValueError("Not enough combinations for the requested cards.")
+        positions = np.arange(first, first + total).reshape(card_count, combinations_per_card)
+    elif mode == MODE_STRATIFIED:
+        bounds = np.linspace(0, len(index), combinations_per_card + 1).astype(np.int64)
+        positions = rng.integers(bounds[:-1], bounds[1:], size=(card_count, combinations_per_card))
+    else:
+        raise ValueError(f"Unknown generation mode: {mode}")
+
+    combos = index.combinations(positions)
+    return _build_cards(combos, index.combo_scores(combos), start_index)
+
+
+def _build_cards(
+    combos: np.ndarray, combo_scores: np.ndarray, start_index: int = 0
+) -> List[Card]:
     cards: List[Card] = []
-    for card_index in range(card_count):
-        combinations = _generate_combinations_for_card(
-            scores,
-            groups,
-            rng,
-            combinations_per_card,
-        )
+    for card_index, (card_combos, card_scores) in enumerate(
+        zip(combos.tolist(), combo_scores.tolist())
+    ):
+        combinations = [
+            Combination(numbers=numbers, score=score, explanation=EXPLANATION_TEXT)
+            for numbers, score in zip(card_combos, card_scores)
+        ]
         cards.append(
-            Card(card_id=f"card-{card_index + 1:03d}", combinations=combinations)
+            Card(card_id=f"card-{start_index + card_index + 1:03d}", combinations=combinations)
         )
 
     return cards
 
 
-def _generate_combinations_for_card(
-    scores: Dict[int, float],
-    groups: Dict[str, List[int]],
+def _sample_unique_combinations(
+    sampler: GroupSampler,
     rng: np.random.Generator,
+    card_count: int,
     combinations_per_card: int,
-) -> List[Combination]:
-    combinations: List[Combination] = []
-    seen: set[tuple[int, ...]] = set()
-    max_attempts = combinations_per_card * 20
-    attempts = 0
-
-    while len(combinations) < combinations_per_card and attempts < max_attempts:
-        attempts += 1
-        numbers = _sample_group(groups["A"], scores, rng, 2)
-        numbers += _sample_group(groups["B"], scores, rng, 2)
-        numbers += _sample_group(groups["C"], scores, rng, 2)
-        numbers = sorted(numbers)
-
-        numbers_key = tuple(numbers)
-        if numbers_key in seen:
-            continue
-
-        seen.add(numbers_key)
-        combo_score = _combo_score(numbers, scores)
-        combinations.append(
-            Combination(numbers=numbers, score=combo_score, explanation=EXPLANATION_TEXT)
-        )
+) -> np.ndarray:
+    selected = np.zeros((card_count, combinations_per_card, 6), dtype=np.int64)
+    filled = np.zeros(card_count, dtype=np.int64)
+    pending = np.arange(card_count)
+
+    for _ in range(MAX_SAMPLING_ROUNDS):
+        if pending.size == 0 or combinations_per_card == 0:
+            break
 
-    if len(combinations) < combinations_per_card:
+        drawn = sampler.sample(rng, (pending.size, combinations_per_card))
+        candidates = np.concatenate([selected[pending], drawn], axis=1)
+        slots = np.arange(candidates.shape[1])
+        valid = (slots < filled[pending, None]) | (slots >= combinations_per_card)
+
+        keep = _first_occurrences(_combo_keys(candidates), valid)
+        keep &= np.cumsum(keep, axis=1) <= combinations_per_card
+        kept_count = keep.sum(axis=1)
+
+        order = np.argsort(~keep, axis=1, kind="stable")[:, :combinations_per_card]
+        selected[pending] = np.take_along_axis(candidates, order[..., None], axis=1)
+        filled[pending] = kept_count
+        pending = pending[kept_count < combinations_per_card]
+
+    if pending.size:
         raise ValueError("Could not generate enough unique combinations.")
 
-    return combinations
+    return selected
 
 
-def _sample_group(
-    group_numbers: List[int],
-    scores: Dict[int, float],
-    rng: np.random.Generator,
-    count: int,
-) -> List[int]:
-    weights = np.array([scores.get(num, 0.0) for num in group_numbers], dtype=float)
-    if weights.sum() <= 0:
-        weights = np.ones_like(weights)
-    probabilities = weights / weights.sum()
-
-    selected_indices = rng.choice(len(group_numbers), size=count, replace=False, p=probabilities)
-    return [group_numbers[i] for i in selected_indices]
-
-
-def _combo_score(numbers: List[int], scores: Dict[int, float]) -> float:
-    if not numbers:
-        return 0.0
-    mean_score = sum(scores.get(num, 0.0) for num in numbers) / len(numbers)
-    return round(mean_score * 100, 2)
+def _combo_keys(combos: np.ndarray) -> np.ndarray:
+    bits = np.left_shift(np.uint64(1), (combos - 1).astype(np.uint64))
+    return np.bitwise_or.reduce(bits, axis=-1)
+
+
+def _first_occurrences(keys: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    keys = np.where(valid, keys, np.uint64(0))
+    order = np.argsort(keys, axis=1, kind="stable")
+    sorted_keys = np.take_along_axis(keys, order, axis=1)
+    is_first = np.ones_like(valid)
+    is_first[:, 1:] = sorted_keys[:, 1:] != sorted_keys[:, :-1]
+    first = np.empty_like(valid)
+    np.put_along_axis(first, order, is_first, axis=1)
+    return first & valid
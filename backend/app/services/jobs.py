@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import hashlib
+import json
+import logging
+from pathlib import Path
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+from uuid import uuid4
+
+from ..db import begin_immediate, get_pool
+from .backtest import BacktestConfig, run_backtest_draws
+from .data import HistorySnapshot
+from .executor import BoundedExecutor
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+PROGRESS_WRITE_INTERVAL = 0.5
+JOB_LEASE_SECONDS = 60.0
+HEARTBEAT_INTERVAL = 15.0
+
+logger = logging.getLogger("mega_facil.jobs")
+
+
+@dataclass(frozen=True)
+class BacktestJob:
+    id: str
+    cache_key: str
+    history_digest: str
+    config: BacktestConfig
+    status: str
+    progress: float
+    cached: bool
+    result: Dict[str, object] | None
+    error: str | None
+    created_at: str
+    updated_at: str
+
+
+class BacktestJobManager:
+    def __init__(self, db_path: Path, executor: BoundedExecutor) -> None:
+        self.db_path = db_path
+        self.executor = executor
+        self._lock = threading.Lock()
+        self._active: Set[str] = set()
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def init_db(self) -> None:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with get_pool(self.db_path).connection() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS backtest_results (
+                    cache_key TEXT PRIMARY KEY,
+                    history_digest TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS backtest_jobs (
+                    id TEXT PRIMARY KEY,
+                    cache_key TEXT NOT NULL,
+                    history_digest TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    cached INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_backtest_jobs_cache_key
+                    ON backtest_jobs(cache_key, status);
+                """
+            )
+        self._reap_orphans()
+
+    def start_heartbeat(self) -> None:
+        if self._heartbeat is not None:
+            return
+        self._stop.clear()
+        self._heartbeat = threading.Thread(
+            target=self._heartbeat_loop, name="backtest-heartbeat", daemon=True
+        )
+        self._heartbeat.start()
+
+    def stop_heartbeat(self) -> None:
+        heartbeat = self._heartbeat
+        if heartbeat is None:
+            return
+        self._stop.set()
+        heartbeat.join()
+        self._heartbeat = None
+
+    def submit(self, history: HistorySnapshot, config: BacktestConfig) -> BacktestJob:
+        history_digest = history.digest
+        params = json.dumps(config.to_dict(), sort_keys=True)
+        cache_key = hashlib.sha256(f"{history_digest}:{params}".encode("utf-8")).hexdigest()
+
+        with get_pool(self.db_path).connection() as conn:
+            begin_immediate(conn)
+            active = conn.execute(
+                "SELECT id FROM backtest_jobs WHERE cache_key = ? AND status IN (?, ?) LIMIT 1",
+                (cache_key, JOB_QUEUED, JOB_RUNNING),
+            ).fetchone()
+            if active is not None:
+                conn.commit()
+                return self.get(active["id"])
+
+            cached = conn.execute(
+                "SELECT 1 FROM backtest_results WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            job_id = str(uuid4())
+            now = _now()
+            conn.execute(
+                """
+                INSERT INTO backtest_jobs (
+                    id, cache_key, history_digest, params, status, progress, cached,
+                    created_at, updated_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    job_id,
+                    cache_key,
+                    history_digest,
+                    params,
+                    JOB_DONE if cached else JOB_QUEUED,
+                    1.0 if cached else 0.0,
+                    1 if cached else 0,
+                    now,
+                    now,
+                ),
+            )
+            conn.commit()
+
+        if not cached:
+            with self._lock:
+                self._active.add(job_id)
+            try:
+                self.executor.submit(
+                    self._run, job_id, cache_key, history_digest, params, history, config
+                )
+            except BaseException:
+                with self._lock:
+                    self._active.discard(job_id)
+                with get_pool(self.db_path).connection() as conn:
+                    conn.execute("DELETE FROM backtest_jobs WHERE id = ?", (job_id,))
+                raise
+
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[BacktestJob]:
+        with get_pool(self.db_path).connection() as conn:
+            row = conn.execute(
+                """
+                SELECT j.*, r.result
+                FROM backtest_jobs j
+                LEFT JOIN backtest_results r ON r.cache_key = j.cache_key AND j.status = ?
+                WHERE j.id = ?
+                """,
+                (JOB_DONE, job_id),
+            ).fetchone()
+        if row is None:
+            return None
+        return BacktestJob(
+            id=row["id"],
+            cache_key=row["cache_key"],
+            history_digest=row["history_digest"],
+            config=BacktestConfig(**json.loads(row["params"])),
+            status=row["status"],
+            progress=round(float(row["progress"]), 4),
+            cached=bool(row["cached"]),
+            result=json.loads(row["result"]) if row["result"] is not None else None,
+            error=row["error"],
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+        )
+
+    def close(self) -> None:
+        self.stop_heartbeat()
+        with self._lock:
+            interrupted, self._active = self._active, set()
+        for job_id in interrupted:
+            self._update(
+                job_id, JOB_FAILED, None, "Backtest interrompido pelo desligamento do servidor."
+            )
+
+    def _run(
+        self,
+        job_id: str,
+        cache_key: str,
+        history_digest: str,
+        params: str,
+        history: HistorySnapshot,
+        config: BacktestConfig,
+    ) -> None:
+        try:
+            self._execute(job_id, cache_key, history_digest, params, history, config)
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+
+    def _execute(
+        self,
+        job_id: str,
+        cache_key: str,
+        history_digest: str,
+        params: str,
+        history: HistorySnapshot,
+        config: BacktestConfig,
+    ) -> None:
+        if not self._update(job_id, JOB_RUNNING, 0.0):
+            return
+        last_write = time.monotonic()
+
+        def report(done: int, total: int) -> None:
+            nonlocal last_write
+            now = time.monotonic()
+            if now - last_write >= PROGRESS_WRITE_INTERVAL:
+                last_write = now
+                self._update(job_id, JOB_RUNNING, done / total)
+
+        try:
+            result = run_backtest_draws(
+                history.draws,
+                config.window_size,
+                config.cards_per_draw,
+                config.combinations_per_card,
+                config.seed,
+                progress=report,
+            )
+        except Exception as exc:
+            logger.exception("backtest_job_failed job_id=%s", job_id)
+            self._update(job_id, JOB_FAILED, None, str(exc))
+            return
+
+        with get_pool(self.db_path).connection() as conn:
+            begin_immediate(conn)
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO backtest_results (
+                    cache_key, history_digest, params, result, created_at
+                )
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (
+                    cache_key,
+                    history_digest,
+                    params,
+                    json.dumps(result, sort_keys=True),
+                    _now(),
+                ),
+            )
+            conn.execute(
+                "UPDATE backtest_jobs SET status = ?, progress = 1, updated_at = ? "
+                "WHERE id = ? AND status = ?",
+                (JOB_DONE, _now(), job_id, JOB_RUNNING),
+            )
+            conn.commit()
+
+    def _update(
+        self,
+        job_id: str,
+        status: str,
+        progress: float | None,
+        error: str | None = None,
+    ) -> bool:
+        with get_pool(self.db_path).connection() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE backtest_jobs
+                SET status = ?, progress = COALESCE(?, progress), error = ?, updated_at = ?
+                WHERE id = ? AND status IN (?, ?)
+                """,
+                (status, progress, error, _now(), job_id, JOB_QUEUED, JOB_RUNNING),
+            )
+        return cursor.rowcount > 0
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                self._touch_active()
+                self._reap_orphans()
+            except Exception:
+                logger.exception("backtest_heartbeat_failed")
+
+    def _touch_active(self) -> None:
+        with self._lock:
+            active: Tuple[str, ...] = tuple(self._active)
+        if not active:
+            return
+        placeholders = ", ".join("?" for _ in active)
+        with get_pool(self.db_path).connection() as conn:
+            conn.execute(
+                f"UPDATE backtest_jobs SET updated_at = ? "
+                f"WHERE id IN ({placeholders}) AND status IN (?, ?)",
+                (_now(), *active, JOB_QUEUED, JOB_RUNNING),
+            )
+
+    def _reap_orphans(self) -> None:
+        cutoff = _format_time(datetime.utcnow() - timedelta(seconds=JOB_LEASE_SECONDS))
+        with get_pool(self.db_path).connection() as conn:
+            cursor = conn.execute(
+                "UPDATE backtest_jobs SET status = ?, error = ?, updated_at = ? "
+                "WHERE status IN (?, ?) AND updated_at < ?",
+                (
+                    JOB_FAILED,
+                    "Backtest interrompido: o processo que o executava parou de responder.",
+                    _now(),
+                    JOB_QUEUED,
+                    JOB_RUNNING,
+                    cutoff,
+                ),
+            )
+        if cursor.rowcount:
+            logger.warning("backtest_jobs_reaped count=%s", cursor.rowcount)
+
+
+def _now() -> str:
+    return _format_time(datetime.utcnow())
+
+
+def _format_time(value: datetime) -> str:
+    return value.isoformat(timespec="seconds") + "Z"
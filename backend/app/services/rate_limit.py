@@ -1,29 +1,182 @@
 from __future__ import annotations
 
-from collections import defaultdict, deque
+import math
+import sqlite3
 import threading
 import time
-from typing import Deque, Dict, Tuple
+from typing import Callable, ContextManager, Dict, List, Protocol, Tuple
+
+BACKEND_MEMORY = "memory"
+BACKEND_SQLITE = "sqlite"
+DEFAULT_STRIPES = 16
+
+ConnectionFactory = Callable[[], ContextManager[sqlite3.Connection]]
+BeginTransaction = Callable[[sqlite3.Connection], None]
+
+
+class RateLimitBackend(Protocol):
+    def hit(self, key: str, limit: int, window_seconds: int, now: float) -> Tuple[bool, int]:
+        ...
+
+    def evict_idle(self, window_seconds: int, now: float) -> int:
+        ...
+
+    def close(self) -> None:
+        ...
 
 
 class RateLimiter:
-    def __init__(self, max_requests: int, window_seconds: int) -> None:
+    def __init__(
+        self,
+        max_requests: int,
+        window_seconds: int,
+        backend: RateLimitBackend | None = None,
+    ) -> None:
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self._lock = threading.Lock()
-        self._requests: Dict[str, Deque[float]] = defaultdict(deque)
+        self.backend = backend if backend is not None else MemoryRateLimitBackend()
+        self._next_eviction = 0.0
 
-    def allow(self, key: str) -> Tuple[bool, int]:
+    def allow(self, key: str, max_requests: int | None = None) -> Tuple[bool, int]:
+        limit = self.max_requests if max_requests is None else max_requests
         now = time.time()
-        with self._lock:
-            queue = self._requests[key]
-            cutoff = now - self.window_seconds
-            while queue and queue[0] < cutoff:
-                queue.popleft()
-
-            if len(queue) >= self.max_requests:
-                retry_after = int(queue[0] + self.window_seconds - now)
-                return False, max(retry_after, 1)
-
-            queue.append(now)
-            return True, 0
+        if now >= self._next_eviction:
+            self._next_eviction = now + self.window_seconds
+            self.backend.evict_idle(self.window_seconds, now)
+        return self.backend.hit(key, limit, self.window_seconds, now)
+
+
+class MemoryRateLimitBackend:
+    def __init__(self, stripes: int = DEFAULT_STRIPES) -> None:
+        if stripes < 1:
+            raise ValueError("Rate limit stripes must be at least 1.")
+        self._stripes = stripes
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._counters: List[Dict[str, List[float]]] = [{} for _ in range(stripes)]
+
+    def hit(self, key: str, limit: int, window_seconds: int, now: float) -> Tuple[bool, int]:
+        stripe = hash(key) % self._stripes
+        counters = self._counters[stripe]
+        with self._locks[stripe]:
+            counter = counters.get(key)
+            if counter is None:
+                counter = [0.0, 0, 0]
+                counters[key] = counter
+            return _sliding_window(counter, limit, window_seconds, now)
+
+    def evict_idle(self, window_seconds: int, now: float) -> int:
+        cutoff = _window_start(now, window_seconds) - window_seconds
+        evicted = 0
+        for lock, counters in zip(self._locks, self._counters):
+            with lock:
+                idle = [key for key, counter in counters.items() if counter[0] < cutoff]
+                for key in idle:
+                    del counters[key]
+            evicted += len(idle)
+        return evicted
+
+    def close(self) -> None:
+        for lock, counters in zip(self._locks, self._counters):
+            with lock:
+                counters.clear()
+
+
+class SQLiteRateLimitBackend:
+    def __init__(
+        self, connect: ConnectionFactory, begin: BeginTransaction | None = None
+    ) -> None:
+        self._connect = connect
+        self._begin = begin or _begin_immediate
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    key TEXT PRIMARY KEY,
+                    window_start REAL NOT NULL,
+                    previous_count INTEGER NOT NULL,
+                    current_count INTEGER NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+
+    def hit(self, key: str, limit: int, window_seconds: int, now: float) -> Tuple[bool, int]:
+        with self._connect() as conn:
+            self._begin(conn)
+            row = conn.execute(
+                "SELECT window_start, previous_count, current_count FROM rate_limits WHERE key = ?",
+                (key,),
+            ).fetchone()
+            counter = list(row) if row is not None else [0.0, 0, 0]
+            allowed, retry_after = _sliding_window(counter, limit, window_seconds, now)
+            conn.execute(
+                """
+                INSERT INTO rate_limits (key, window_start, previous_count, current_count)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    window_start = excluded.window_start,
+                    previous_count = excluded.previous_count,
+                    current_count = excluded.current_count
+                """,
+                (key, *counter),
+            )
+            conn.commit()
+        return allowed, retry_after
+
+    def evict_idle(self, window_seconds: int, now: float) -> int:
+        cutoff = _window_start(now, window_seconds) - window_seconds
+        with self._connect() as conn:
+            cursor = conn.execute("DELETE FROM rate_limits WHERE window_start < ?", (cutoff,))
+            return cursor.rowcount
+
+    def close(self) -> None:
+        pass
+
+
+def create_backend(
+    name: str,
+    stripes: int = DEFAULT_STRIPES,
+    connect: ConnectionFactory | None = None,
+    begin: BeginTransaction | None = None,
+) -> RateLimitBackend:
+    if name == BACKEND_MEMORY:
+        return MemoryRateLimitBackend(stripes)
+    if name == BACKEND_SQLITE:
+        if connect is None:
+            raise ValueError("The sqlite rate limit backend needs a connection factory.")
+        return SQLiteRateLimitBackend(connect, begin)
+    raise ValueError(f"Unknown rate limit backend: {name}")
+
+
+def _begin_immediate(conn: sqlite3.Connection) -> None:
+    conn.execute("BEGIN IMMEDIATE")
+
+
+def _window_start(now: float, window_seconds: int) -> float:
+    return now - now % window_seconds
+
+
+def _sliding_window(
+    counter: List[float],
+    limit: int,
+    window_seconds: int,
+    now: float,
+) -> Tuple[bool, int]:
+    window_start, previous_count, current_count = counter
+    elapsed = now - window_start
+    if elapsed >= window_seconds:
+        current_start = now - now % window_seconds
+        previous_count = current_count if elapsed < 2 * window_seconds else 0
+        current_count = 0
+        window_start = current_start
+        elapsed = now - window_start
+        counter[0], counter[1], counter[2] = window_start, previous_count, 0
+
+    if previous_count * (1 - elapsed / window_seconds) + current_count < limit:
+        counter[2] = current_count + 1
+        return True, 0
+
+    if current_count >= limit or previous_count == 0:
+        retry_after = window_seconds - elapsed
+    else:
+        retry_after = window_seconds * (1 - (limit - current_count) / previous_count) - elapsed
+    return False, max(int(math.ceil(retry_after)), 1)
@@ -1,98 +1,111 @@
 from __future__ import annotations
 
-from collections import Counter
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import math
 from typing import Dict, List
 
+import numpy as np
 import pandas as pd
 
 from .data import NUMBER_COLUMNS
 
+TOTAL_NUMBERS = 60
+RECENCY_SCAN_ROWS = 64
+
 
 @dataclass(frozen=True)
 class ScoreResult:
     scores: Dict[int, float]
     groups: Dict[str, List[int]]
+    score_array: np.ndarray = field(repr=False, compare=False)
 
 
 def compute_number_scores(history_df: pd.DataFrame, window_size: int) -> ScoreResult:
-    numbers = list(range(1, 61))
+    draws = history_df[NUMBER_COLUMNS].to_numpy(dtype=np.int64)
+    return compute_scores_from_draws(draws, window_size)
 
-    total_draws = history_df[NUMBER_COLUMNS].to_numpy().flatten()
-    total_counts = Counter(total_draws)
-    global_norm = _normalize_by_max(total_counts, numbers)
 
-    recent_df = history_df.tail(window_size)
-    recent_draws = recent_df[NUMBER_COLUMNS].to_numpy().flatten()
-    recent_counts = Counter(recent_draws)
-    recent_norm = _normalize_by_max(recent_counts, numbers)
+def compute_scores_from_draws(draws: np.ndarray, window_size: int) -> ScoreResult:
+    flat = draws.ravel()
+    total_counts = np.bincount(flat, minlength=TOTAL_NUMBERS + 1)[1:]
 
-    recency_raw = _compute_recency(history_df, numbers)
-    recency_norm = _normalize_inverted(recency_raw)
+    if window_size > 0:
+        recent_counts = np.bincount(
+            draws[-window_size:].ravel(), minlength=TOTAL_NUMBERS + 1
+        )[1:]
+    else:
+        recent_counts = np.zeros(TOTAL_NUMBERS, dtype=np.int64)
 
-    raw_scores = {
-        n: 0.5 * global_norm[n] + 0.3 * recent_norm[n] + 0.2 * recency_norm[n]
-        for n in numbers
-    }
-    scores = _normalize_minmax(raw_scores)
+    recency = _compute_recency(draws)
 
-    groups = _assign_groups(scores)
+    return score_from_counts(total_counts, recent_counts, recency)
 
-    return ScoreResult(scores=scores, groups=groups)
 
+def score_from_counts(
+    total_counts: np.ndarray,
+    recent_counts: np.ndarray,
+    recency: np.ndarray,
+) -> ScoreResult:
+    global_norm = _normalize_by_max(total_counts)
+    recent_norm = _normalize_by_max(recent_counts)
+    recency_norm = _normalize_inverted(recency)
 
-def _compute_recency(history_df: pd.DataFrame, numbers: List[int]) -> Dict[int, int]:
-    draws = history_df[NUMBER_COLUMNS].to_numpy()
-    last_seen: Dict[int, int | None] = {n: None for n in numbers}
+    raw_scores = 0.5 * global_norm + 0.3 * recent_norm + 0.2 * recency_norm
+    score_array = _normalize_minmax(raw_scores)
+    score_array.flags.writeable = False
 
-    for offset, row in enumerate(draws[::-1]):
-        for num in row:
-            if last_seen[num] is None:
-                last_seen[num] = offset
+    scores = dict(zip(range(1, TOTAL_NUMBERS + 1), score_array.tolist()))
+    groups = _assign_groups(score_array)
 
-    seen_values = [value for value in last_seen.values() if value is not None]
-    max_seen = max(seen_values) if seen_values else 0
+    return ScoreResult(scores=scores, groups=groups, score_array=score_array)
 
-    return {
-        n: (last_seen[n] if last_seen[n] is not None else max_seen + 1)
-        for n in numbers
-    }
 
+def _compute_recency(draws: np.ndarray) -> np.ndarray:
+    total_rows = len(draws)
+    span = min(total_rows, RECENCY_SCAN_ROWS)
+    while True:
+        tail = draws[total_rows - span :][::-1]
+        present = np.zeros((span, TOTAL_NUMBERS + 1), dtype=bool)
+        present[np.arange(span)[:, None], tail] = True
+        present = present[:, 1:]
+        seen = present.any(axis=0)
+        if seen.all() or span == total_rows:
+            break
+        span = min(span * 4, total_rows)
 
-def _normalize_by_max(counts: Counter, numbers: List[int]) -> Dict[int, float]:
-    values = {n: float(counts.get(n, 0)) for n in numbers}
-    max_value = max(values.values()) if values else 0.0
+    recency = present.argmax(axis=0) if span else np.zeros(TOTAL_NUMBERS, dtype=np.int64)
+    max_seen = int(recency[seen].max()) if seen.any() else 0
+    return np.where(seen, recency, max_seen + 1)
+
+
+def _normalize_by_max(values: np.ndarray) -> np.ndarray:
+    values = values.astype(float)
+    max_value = values.max()
     if max_value == 0:
-        return {n: 0.0 for n in numbers}
-    return {n: value / max_value for n, value in values.items()}
+        return np.zeros_like(values)
+    return values / max_value
 
 
-def _normalize_minmax(values: Dict[int, float]) -> Dict[int, float]:
-    if not values:
-        return {}
-    min_value = min(values.values())
-    max_value = max(values.values())
+def _normalize_minmax(values: np.ndarray) -> np.ndarray:
+    values = values.astype(float)
+    min_value = values.min()
+    max_value = values.max()
     if max_value == min_value:
-        return {key: 1.0 for key in values}
-    return {key: (val - min_value) / (max_value - min_value) for key, val in values.items()}
+        return np.ones_like(values)
+    return (values - min_value) / (max_value - min_value)
 
 
-def _normalize_inverted(values: Dict[int, int]) -> Dict[int, float]:
-    if not values:
-        return {}
-    min_value = min(values.values())
-    max_value = max(values.values())
+def _normalize_inverted(values: np.ndarray) -> np.ndarray:
+    values = values.astype(float)
+    min_value = values.min()
+    max_value = values.max()
     if max_value == min_value:
-        return {key: 1.0 for key in values}
-    return {
-        key: 1 - (val - min_value) / (max_value - min_value)
-        for key, val in values.items()
-    }
+        return np.ones_like(values)
+    return 1 - (values - min_value) / (max_value - min_value)
 
 
-def _assign_groups(scores: Dict[int, float]) -> Dict[str, List[int]]:
-    sorted_numbers = sorted(scores.keys(), key=lambda num: scores[num], reverse=True)
+def _assign_groups(score_array: np.ndarray) -> Dict[str, List[int]]:
+    sorted_numbers = (np.argsort(-score_array, kind="stable") + 1).tolist()
     total = len(sorted_numbers)
 
     group_a = int(math.ceil(total * 0.2))
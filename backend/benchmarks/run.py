@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import argparse
+from datetime import datetime
+import json
+import os
+from pathlib import Path
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR))
+
+from app.db import ROLE_ADMIN, add_credits, close_pools, create_user, init_db  # noqa: E402
+from app.services.backtest import run_backtest  # noqa: E402
+from app.services.data import NUMBER_COLUMNS, load_history  # noqa: E402
+from app.services.generator import generate_cards  # noqa: E402
+from app.services.rate_limit import RateLimiter  # noqa: E402
+from app.services.scoring import compute_number_scores  # noqa: E402
+
+DEFAULT_SIZES = "100,1000,10000,100000"
+DEFAULT_CARD_COUNTS = "1,10,50"
+WINDOW_SIZE = 50
+MIN_ROUND_SECONDS = 0.05
+DEFAULT_BASELINE = BASE_DIR / "benchmarks" / "baseline.json"
+
+
+class Runner:
+    def __init__(self, repeat: int, pattern: str | None) -> None:
+        self.repeat = repeat
+        self.pattern = pattern
+        self.results: Dict[str, Dict[str, float]] = {}
+
+    def wants(self, name: str) -> bool:
+        return not self.pattern or self.pattern in name
+
+    def bench(
+        self,
+        name: str,
+        fn: Callable[[], object],
+        operations: int = 1,
+        repeat: int | None = None,
+    ) -> None:
+        if not self.wants(name):
+            return
+        rounds = repeat or self.repeat
+        loops = _calibrate(fn)
+        timings: List[float] = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            timings.append((time.perf_counter() - started) / loops)
+
+        median = statistics.median(timings)
+        self.results[name] = {
+            "median_s": median,
+            "min_s": min(timings),
+            "rounds": rounds,
+            "loops": loops,
+            "ops_per_s": operations / median if median else 0.0,
+        }
+        print(f"{name:<52} median={median * 1000:10.3f}ms ops/s={operations / median:12.1f}", flush=True)
+
+
+def _calibrate(fn: Callable[[], object]) -> int:
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    if elapsed <= 0:
+        return 1
+    return max(1, int(MIN_ROUND_SECONDS / elapsed))
+
+
+def synthetic_history(draws: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    numbers = np.argsort(rng.random((draws, 60)), axis=1)[:, :6] + 1
+    numbers.sort(axis=1)
+    df = pd.DataFrame(numbers, columns=NUMBER_COLUMNS)
+    df.insert(0, "concurso", np.arange(1, draws + 1))
+    return df
+
+
+def bench_history(runner: Runner, workdir: Path, sizes: List[int], backtest_max: int) -> None:
+    for size in sizes:
+        df = synthetic_history(size)
+        csv_path = workdir / f"history_{size}.csv"
+        df.to_csv(csv_path, index=False)
+
+        runner.bench(f"load_history[draws={size}]", lambda: load_history(csv_path), size)
+        runner.bench(
+            f"compute_number_scores[draws={size}]",
+            lambda: compute_number_scores(df, WINDOW_SIZE),
+        )
+        if size <= backtest_max:
+            runner.bench(
+                f"run_backtest[draws={size}]",
+                lambda: run_backtest(df, WINDOW_SIZE, seed=0),
+                size,
+                repeat=max(runner.repeat // 2, 1),
+            )
+
+
+def bench_generation(runner: Runner, card_counts: List[int]) -> None:
+    score_result = compute_number_scores(synthetic_history(1000), WINDOW_SIZE)
+    for count in card_counts:
+        rng = np.random.default_rng(0)
+        runner.bench(
+            f"generate_cards[cartoes={count}]",
+            lambda: generate_cards(score_result.scores, score_result.groups, rng, count, 3),
+            count,
+        )
+
+
+def bench_credits(runner: Runner, workdir: Path, threads: int, operations: int) -> None:
+    if not runner.wants(f"add_credits[threads={threads}]"):
+        return
+    db_path = workdir / "credits.db"
+    init_db(db_path)
+    user = create_user(db_path, "bench-credits", "bench-password", ROLE_ADMIN)
+
+    def contended() -> None:
+        per_thread = operations // threads
+
+        def worker() -> None:
+            for _ in range(per_thread):
+                add_credits(db_path, user.id, 1, "benchmark", user.id)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+    runner.bench(f"add_credits[threads={threads}]", contended, operations)
+
+
+def bench_rate_limit(runner: Runner, threads: int, calls: int) -> None:
+    keys = [f"ip:10.0.{index // 256}.{index % 256}" for index in range(1000)]
+
+    def contended() -> None:
+        limiter = RateLimiter(100, 60)
+
+        def worker(offset: int) -> None:
+            for index in range(calls // threads):
+                limiter.allow(keys[(offset + index) % len(keys)])
+
+        workers = [threading.Thread(target=worker, args=(i * 7919,)) for i in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+    runner.bench(f"rate_limiter_allow[threads={threads}]", contended, calls)
+
+
+def bench_endpoint(runner: Runner, workdir: Path, card_counts: List[int], requests: int) -> None:
+    if not any(runner.wants(f"generate_endpoint[cartoes={count}]") for count in card_counts):
+        return
+    csv_path = workdir / "endpoint_history.csv"
+    synthetic_history(1000).to_csv(csv_path, index=False)
+    os.environ.update(
+        {
+            "MEGA_FACIL_CSV_PATH": str(csv_path),
+            "MEGA_FACIL_DB_PATH": str(workdir / "endpoint.db"),
+            "MEGA_FACIL_RATE_LIMIT_DB_PATH": str(workdir / "rate_limit.db"),
+            "MEGA_FACIL_ADMIN_USERNAME": "bench-admin",
+            "MEGA_FACIL_ADMIN_PASSWORD": "bench-password",
+            "MEGA_FACIL_RATE_LIMIT_MAX": str(10**9),
+            "MEGA_FACIL_LOG_LEVEL": "WARNING",
+        }
+    )
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        login = client.post(
+            "/auth/login", json={"username": "bench-admin", "password": "bench-password"}
+        ).json()
+        headers = {"X-Api-Key": login["api_key"]}
+        client.post(
+            "/admin/credits",
+            json={"user_id": login["id"], "delta": 10**9},
+            headers=headers,
+        )
+
+        for count in card_counts:
+            body = {"cartoes": count, "user_id": login["id"], "pagamento_confirmado": True}
+
+            def generate() -> None:
+                for _ in range(requests):
+                    response = client.post("/generate", json=body, headers=headers)
+                    if response.status_code != 200:
+                        raise RuntimeError(f"/generate failed: {response.text}")
+
+            runner.bench(f"generate_endpoint[cartoes={count}]", generate, requests)
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline_path: Path, threshold: float) -> List[str]:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))["results"]
+    regressions = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        ratio = current["median_s"] / previous["median_s"]
+        status = "REGRESSION" if ratio > 1 + threshold else "ok"
+        print(f"{name:<52} {ratio:6.2f}x {status}")
+        if status != "ok":
+            regressions.append(name)
+    return regressions
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MEGA FACIL backend benchmarks")
+    parser.add_argument("--sizes", type=_int_list, default=_int_list(DEFAULT_SIZES))
+    parser.add_argument("--card-counts", type=_int_list, default=_int_list(DEFAULT_CARD_COUNTS))
+    parser.add_argument("--backtest-max-draws", type=int, default=10000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", default=None, help="Only run benchmarks whose name contains this")
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    parser.add_argument(
+        "--baseline",
+        default=str(DEFAULT_BASELINE),
+        help="Compare against a previous JSON result (default: benchmarks/baseline.json)",
+    )
+    parser.add_argument("--no-baseline", action="store_true", help="Skip the baseline comparison")
+    parser.add_argument("--threshold", type=float, default=0.5)
+
+    args = parser.parse_args()
+    runner = Runner(args.repeat, args.filter)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        try:
+            bench_history(runner, workdir, args.sizes, args.backtest_max_draws)
+            bench_generation(runner, args.card_counts)
+            bench_credits(runner, workdir, args.threads, 800)
+            bench_rate_limit(runner, args.threads, 80000)
+            bench_endpoint(runner, workdir, args.card_counts, 20)
+        finally:
+            close_pools()
+
+    payload = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "results": runner.results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+
+    if not args.no_baseline and Path(args.baseline).exists():
+        regressions = compare(runner.results, Path(args.baseline), args.threshold)
+        if regressions:
+            raise SystemExit(f"{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
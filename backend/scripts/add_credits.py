@@ -8,7 +8,7 @@ BASE_DIR = Path(__file__).resolve().parents[1]
 sys.path.append(str(BASE_DIR))
 
 from app.config import settings  # noqa: E402
-from app.db import add_credits, get_user_by_username, init_db  # noqa: E402
+from app.db import add_credits, close_pools, get_user_by_username, init_db  # noqa: E402
 
 
 def main() -> None:
@@ -40,4 +40,7 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        close_pools()
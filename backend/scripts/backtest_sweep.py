@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+from pathlib import Path
+import sys
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR))
+
+from app.config import settings  # noqa: E402
+from app.services.backtest import BacktestConfig, run_backtest_sweep  # noqa: E402
+from app.services.data import HistoryCache  # noqa: E402
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run backtests over a grid of configurations")
+    parser.add_argument("--window-sizes", type=_int_list, default=[settings.window_size])
+    parser.add_argument("--cards-per-draw", type=_int_list, default=[1])
+    parser.add_argument("--combinations-per-card", type=_int_list, default=[settings.combinations_per_card])
+    parser.add_argument("--seeds", type=_int_list, default=[0])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--csv-path",
+        default=str(settings.csv_path),
+        help="Path to the history CSV",
+    )
+    parser.add_argument(
+        "--bin-path",
+        default=str(settings.history_bin_path) if settings.history_bin_path else None,
+        help="Path to the binary history file (preferred when present)",
+    )
+
+    args = parser.parse_args()
+    bin_path = Path(args.bin_path) if args.bin_path else None
+    history = HistoryCache(Path(args.csv_path), binary_path=bin_path).get()
+
+    configs = [
+        BacktestConfig(window_size, cards, combinations, seed)
+        for window_size, cards, combinations, seed in itertools.product(
+            args.window_sizes,
+            args.cards_per_draw,
+            args.combinations_per_card,
+            args.seeds,
+        )
+    ]
+
+    for config, result, aggregate in run_backtest_sweep(history.draws, configs, args.workers):
+        line = {"config": config.to_dict(), "result": result, "aggregate": aggregate}
+        print(json.dumps(line, sort_keys=True), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR))
+
+from app.db import (  # noqa: E402
+    DEFAULT_SYNCHRONOUS,
+    LEDGER_MAX_BATCH,
+    LEDGER_MAX_DELAY_MS,
+    ROLE_USER,
+    LedgerWriter,
+    close_pools,
+    configure_pool,
+    create_user,
+    debit_credits,
+    init_db,
+)
+
+
+def run(
+    name: str,
+    threads: int,
+    attempts: int,
+    users: int,
+    credits: int,
+    max_batch: int,
+    max_delay_ms: float,
+    synchronous: str,
+) -> Dict[str, object]:
+    db_path = Path(tempfile.mkdtemp()) / "bench_ledger.db"
+    configure_pool(db_path, synchronous)
+    init_db(db_path)
+    user_ids: List[str] = [
+        create_user(db_path, f"ledger-{name}-{index}", "bench", ROLE_USER, credits=credits).id
+        for index in range(users)
+    ]
+    writer = LedgerWriter(db_path, max_batch, max_delay_ms) if name == "group_commit" else None
+
+    def debit(user_id: str) -> int:
+        if writer is not None:
+            return writer.debit(user_id, 1, "bench_ledger", user_id)
+        return debit_credits(db_path, user_id, 1, "bench_ledger", user_id)
+
+    counters = {"ok": 0, "insufficient": 0}
+    counters_lock = threading.Lock()
+    start_barrier = threading.Barrier(threads + 1)
+
+    def worker(offset: int) -> None:
+        start_barrier.wait()
+        for attempt in range(attempts):
+            try:
+                debit(user_ids[(offset + attempt) % users])
+                outcome = "ok"
+            except ValueError:
+                outcome = "insufficient"
+            with counters_lock:
+                counters[outcome] += 1
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    commits = counters["ok"]
+    if writer is not None:
+        writer.close()
+        commits = int(writer.stats()["commits"])
+
+    with sqlite3.connect(db_path) as conn:
+        balance = conn.execute("SELECT COALESCE(SUM(credits), 0) FROM users").fetchone()[0]
+        ledger = conn.execute(
+            "SELECT COALESCE(SUM(delta), 0), COUNT(*) FROM credit_transactions"
+        ).fetchone()
+    close_pools()
+
+    return {
+        "path": name,
+        "debits_ok": counters["ok"],
+        "insufficient": counters["insufficient"],
+        "commits": commits,
+        "avg_batch": round(counters["ok"] / commits, 1) if commits else 0.0,
+        "consistent": balance == users * credits - counters["ok"]
+        and ledger[0] == -counters["ok"]
+        and ledger[1] == counters["ok"],
+        "debits_per_sec": round(counters["ok"] / elapsed, 1) if elapsed else 0.0,
+        "commits_per_sec": round(commits / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-request debit vs group-commit ledger writer")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=200)
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--credits", type=int, default=None)
+    parser.add_argument("--max-batch", type=int, default=LEDGER_MAX_BATCH)
+    parser.add_argument("--max-delay-ms", type=float, default=LEDGER_MAX_DELAY_MS)
+    parser.add_argument(
+        "--synchronous",
+        default=DEFAULT_SYNCHRONOUS,
+        help="SQLite synchronous mode; FULL syncs the WAL on every commit",
+    )
+
+    args = parser.parse_args()
+    credits = (
+        args.credits
+        if args.credits is not None
+        else args.threads * args.attempts * 3 // (4 * args.users)
+    )
+
+    failed = False
+    for name in ("per_request", "group_commit"):
+        result = run(
+            name,
+            args.threads,
+            args.attempts,
+            args.users,
+            credits,
+            args.max_batch,
+            args.max_delay_ms,
+            args.synchronous,
+        )
+        print(" ".join(f"{key}={value}" for key, value in result.items()))
+        failed = failed or not result["consistent"]
+
+    if failed:
+        raise SystemExit("ledger and balances diverged")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import argparse
+from collections import defaultdict, deque
+from pathlib import Path
+import sys
+import threading
+import time
+from typing import Deque, Dict, List, Tuple
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR))
+
+from app.services.rate_limit import MemoryRateLimitBackend, RateLimiter  # noqa: E402
+
+
+class LegacyRateLimiter:
+    def __init__(self, max_requests: int, window_seconds: int) -> None:
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._requests: Dict[str, Deque[float]] = defaultdict(deque)
+
+    def allow(self, key: str) -> Tuple[bool, int]:
+        now = time.time()
+        with self._lock:
+            queue = self._requests[key]
+            cutoff = now - self.window_seconds
+            while queue and queue[0] < cutoff:
+                queue.popleft()
+
+            if len(queue) >= self.max_requests:
+                retry_after = int(queue[0] + self.window_seconds - now)
+                return False, max(retry_after, 1)
+
+            queue.append(now)
+            return True, 0
+
+
+def run(limiter, threads: int, calls: int, keys: List[str]) -> float:
+    start_barrier = threading.Barrier(threads + 1)
+
+    def worker(offset: int) -> None:
+        allow = limiter.allow
+        key_count = len(keys)
+        start_barrier.wait()
+        for index in range(calls):
+            allow(keys[(offset + index) % key_count])
+
+    workers = [
+        threading.Thread(target=worker, args=(thread_index * 7919,))
+        for thread_index in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return threads * calls / elapsed if elapsed else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rate limiter allow() throughput benchmark")
+    parser.add_argument("--threads", default="1,4,16")
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--keys", type=int, default=1000)
+    parser.add_argument("--max-requests", type=int, default=100)
+    parser.add_argument("--window", type=int, default=60)
+    parser.add_argument("--stripes", type=int, default=16)
+
+    args = parser.parse_args()
+    keys = [f"ip:10.0.{index // 256}.{index % 256}" for index in range(args.keys)]
+
+    factories = [
+        ("legacy", lambda: LegacyRateLimiter(args.max_requests, args.window)),
+        (
+            "striped-1",
+            lambda: RateLimiter(args.max_requests, args.window, MemoryRateLimitBackend(1)),
+        ),
+        (
+            f"striped-{args.stripes}",
+            lambda: RateLimiter(
+                args.max_requests, args.window, MemoryRateLimitBackend(args.stripes)
+            ),
+        ),
+    ]
+
+    for threads in (int(value) for value in args.threads.split(",")):
+        for name, factory in factories:
+            calls_per_sec = run(factory(), threads, args.calls, keys)
+            print(f"limiter={name} threads={threads} calls_per_sec={calls_per_sec:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import sys
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR))
+
+from app.config import settings  # noqa: E402
+from app.services.data import load_history, write_history_binary  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert the history CSV into the binary format")
+    parser.add_argument(
+        "--csv-path",
+        default=str(settings.csv_path),
+        help="Path to the history CSV",
+    )
+    parser.add_argument(
+        "--output",
+        default=str(settings.history_bin_path or Path(settings.csv_path).with_suffix(".bin")),
+        help="Path to the binary history file",
+    )
+
+    args = parser.parse_args()
+    csv_path = Path(args.csv_path)
+    output = Path(args.output)
+
+    df = load_history(csv_path)
+    write_history_binary(output, df)
+
+    print("History converted:")
+    print(f"  draws: {len(df)}")
+    print(f"  last_concurso: {int(df['concurso'].iloc[-1]) if len(df) else '-'}")
+    print(f"  output: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,14 @@ BASE_DIR = Path(__file__).resolve().parents[1]
 sys.path.append(str(BASE_DIR))
 
 from app.config import settings  # noqa: E402
-from app.db import ROLE_ADMIN, ROLE_AFFILIATE, ROLE_USER, create_user, init_db  # noqa: E402
+from app.db import (  # noqa: E402
+    ROLE_ADMIN,
+    ROLE_AFFILIATE,
+    ROLE_USER,
+    close_pools,
+    create_user,
+    init_db,
+)
 
 
 def main() -> None:
@@ -27,7 +34,15 @@ def main() -> None:
     db_path = Path(args.db_path)
 
     init_db(db_path)
-    user = create_user(db_path, args.username, args.password, args.role, args.credits)
+    user = create_user(
+        db_path,
+        args.username,
+        args.password,
+        args.role,
+        args.credits,
+        password_algorithm=settings.password_algorithm,
+        password_iterations=settings.password_iterations,
+    )
 
     print("User created:")
     print(f"  id: {user.id}")
@@ -38,4 +53,7 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        close_pools()
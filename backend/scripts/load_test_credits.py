@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR))
+
+from app.db import ROLE_USER, close_pools, create_user, debit_credits, init_db  # noqa: E402
+
+
+def legacy_debit(db_path: Path, user_id: str, amount: int, reason: str, created_by: str) -> int:
+    with sqlite3.connect(db_path, check_same_thread=False) as conn:
+        row = conn.execute("SELECT credits FROM users WHERE id = ?", (user_id,)).fetchone()
+        if row is None:
+            raise ValueError("User not found")
+        new_total = int(row[0]) - amount
+        if new_total < 0:
+            raise ValueError("Insufficient credits")
+        conn.execute("UPDATE users SET credits = ? WHERE id = ?", (new_total, user_id))
+        conn.execute(
+            "INSERT INTO credit_transactions (user_id, delta, reason, created_by, created_at) "
+            "VALUES (?, ?, ?, ?, datetime('now'))",
+            (user_id, -amount, reason, created_by),
+        )
+        conn.commit()
+        return new_total
+
+
+def run(
+    name: str,
+    debit: Callable[[Path, str, int, str, str], int],
+    threads: int,
+    attempts: int,
+    credits: int,
+) -> Dict[str, object]:
+    db_path = Path(tempfile.mkdtemp()) / "load_test.db"
+    init_db(db_path)
+    user = create_user(db_path, f"load-{name}", "load-test", ROLE_USER, credits=credits)
+
+    counters = {"ok": 0, "insufficient": 0, "errors": 0}
+    counters_lock = threading.Lock()
+    start_barrier = threading.Barrier(threads + 1)
+
+    def worker() -> None:
+        start_barrier.wait()
+        for _ in range(attempts):
+            try:
+                debit(db_path, user.id, 1, "load_test", user.id)
+                outcome = "ok"
+            except ValueError:
+                outcome = "insufficient"
+            except sqlite3.Error:
+                outcome = "errors"
+            with counters_lock:
+                counters[outcome] += 1
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with sqlite3.connect(db_path) as conn:
+        balance = conn.execute("SELECT credits FROM users WHERE id = ?", (user.id,)).fetchone()[0]
+        ledger = conn.execute(
+            "SELECT COALESCE(SUM(delta), 0), COUNT(*) FROM credit_transactions WHERE user_id = ?",
+            (user.id,),
+        ).fetchone()
+    close_pools()
+
+    return {
+        "path": name,
+        "debits_ok": counters["ok"],
+        "insufficient": counters["insufficient"],
+        "errors": counters["errors"],
+        "final_balance": balance,
+        "expected_balance": credits - counters["ok"],
+        "ledger_sum": ledger[0],
+        "lost_updates": (credits - balance) != counters["ok"] or ledger[1] != counters["ok"],
+        "debits_per_sec": round(counters["ok"] / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent credit debit load test")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=200)
+    parser.add_argument("--credits", type=int, default=None)
+    parser.add_argument("--skip-legacy", action="store_true")
+
+    args = parser.parse_args()
+    credits = args.credits if args.credits is not None else args.threads * args.attempts * 3 // 4
+
+    paths = [("atomic", debit_credits)]
+    if not args.skip_legacy:
+        paths.append(("legacy", legacy_debit))
+
+    failed = False
+    for name, debit in paths:
+        result = run(name, debit, args.threads, args.attempts, credits)
+        print(" ".join(f"{key}={value}" for key, value in result.items()))
+        if name == "atomic":
+            failed = bool(result["lost_updates"] or result["errors"] or result["final_balance"] < 0)
+
+    if failed:
+        raise SystemExit("atomic debit path lost updates or failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR))
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.backtest import IncrementalScorer
+from app.services.data import NUMBER_COLUMNS
+from app.services.scoring import compute_number_scores
+
+
+def _synthetic_history(draws: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    numbers = np.argsort(rng.random((draws, 60)), axis=1)[:, :6] + 1
+    numbers.sort(axis=1)
+    return pd.DataFrame(numbers, columns=NUMBER_COLUMNS)
+
+
+@pytest.mark.parametrize("window_size", [0, 1, 10, 50, 500])
+def test_incremental_scorer_matches_compute_number_scores(window_size: int) -> None:
+    history = _synthetic_history(120, seed=window_size)
+    draws = history[NUMBER_COLUMNS].to_numpy(dtype=np.int64)
+    scorer = IncrementalScorer(draws, window_size)
+
+    for size in range(1, len(history) + 1):
+        scorer.advance()
+        assert scorer.size == size
+        expected = compute_number_scores(history.iloc[:size], window_size)
+        result = scorer.score()
+        assert result.scores == expected.scores
+        assert result.groups == expected.groups
+        np.testing.assert_array_equal(result.score_array, expected.score_array)